@@ -0,0 +1,194 @@
+"""
+Asyncio API for rendering sheets and text and exporting bitmaps.
+
+Work runs on one thread of its own, since pygame is not thread safe, and
+that thread keeps the fonts, cmap indexes, laid out texts and glyph renders
+of the most recently used sizes warm for every caller.  Identical requests
+that are in flight at the same time are rendered once and share the
+result.  A caller that is cancelled stops waiting straight away, and the
+work itself is dropped if no one else is waiting for it and it has not
+started yet.
+
+    async with async_render.Renderer() as renderer:
+        surface = await renderer.render_sheet(font_path, 16, 'cp437')
+        async for path in renderer.export_bitmaps(font_path, output):
+            ...
+
+Callers that share a request share its surface: copy it before drawing on
+it.
+"""
+
+import asyncio
+import importlib
+import os
+from collections import Counter, OrderedDict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+font_viewer = importlib.import_module('font-viewer')
+pygame = font_viewer.pygame
+
+FontState = namedtuple('FontState', 'font, font_dimensions, glyphs, renders')
+
+
+def get_colors_key(colors):
+    return frozenset(colors.items()) if colors else None
+
+
+class Renderer(object):
+    """Renders for asyncio callers on a thread of its own; see the module
+    docstring"""
+
+    def __init__(self, max_fonts=32):
+        self.max_fonts = max_fonts
+        self.executor = ThreadPoolExecutor(1, thread_name_prefix='async_render', initializer=font_viewer.init_headless)
+        self.fonts = OrderedDict()  # (font path, point size): FontState
+        self.texts = {}  # (font path, text name): laid out text
+        self.in_flight = {}  # key: [future, waiters]
+        self.stats = Counter()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Drops queued work and stops the thread once the running job is
+        done"""
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    # Run on the render thread
+
+    def get_font(self, font_path, point_size):
+        key = font_path, point_size
+        if key in self.fonts:
+            self.fonts.move_to_end(key)
+            return self.fonts[key]
+        glyphs = font_viewer.cmap.get_cmap_index(font_path)
+        font = font_viewer.load_font(font_path, point_size)
+        # renders count against the budget, which may evict them
+        renders = font_viewer.budget.BudgetedDict('renders')
+        symbols, font_dimensions = font_viewer.get_font_dimensions(font, point_size, glyphs, renders)
+        self.fonts[key] = FontState(font, font_dimensions, glyphs, renders)
+        while len(self.fonts) > self.max_fonts:
+            evicted_key, evicted = self.fonts.popitem(last=False)
+            evicted.renders.release()
+        return self.fonts[key]
+
+    def get_text(self, font_path, text_name, glyphs):
+        key = font_path, text_name
+        if key not in self.texts:
+            self.texts[key] = font_viewer.get_text(text_name, glyphs)
+        return self.texts[key]
+
+    def draw(self, font_path, point_size, text, colors, blend_mode):
+        font_state = self.get_font(font_path, point_size)
+        # colored renders are only shared within a call, so that callers'
+        #  colors do not pile up in the warm cache; blended colors are drawn
+        #  from the plain renders
+        renders = dict(font_state.renders) if colors and not blend_mode else font_state.renders
+        self.stats['rendered'] += 1
+        return font_viewer.render_text_surface(
+            text, font_state.font, font_state.font_dimensions,
+            colors=colors, ignore_whitespace=True, renders=renders, blend_mode=blend_mode,
+        )
+
+    def draw_sheet(self, font_path, point_size, text_name, colors, blend_mode=None):
+        glyphs = self.get_font(font_path, point_size).glyphs
+        return self.draw(font_path, point_size, self.get_text(font_path, text_name, glyphs), colors, blend_mode)
+
+    def draw_text(self, font_path, point_size, text, colors, tab_size, blend_mode=None):
+        return self.draw(font_path, point_size, font_viewer.layout_text(text, tab_size=tab_size), colors, blend_mode)
+
+    def save_sheet(self, font_path, point_size, text_name, path):
+        surface = self.draw_sheet(font_path, point_size, text_name, None)
+        pygame.image.save(surface, str(path))
+        return path
+
+    # Called from the event loop
+
+    async def submit(self, key, function, *args):
+        """Runs function(*args) on the render thread, or waits for the
+        identical request already in flight"""
+        self.stats['requests'] += 1
+        entry = self.in_flight.get(key)
+        if entry is None:
+            work = self.executor.submit(function, *args)
+            entry = self.in_flight[key] = [asyncio.wrap_future(work), work, 0]
+            entry[0].add_done_callback(lambda future: self.forget(key, entry))
+        else:
+            self.stats['deduplicated'] += 1
+        future, work, waiters = entry
+        entry[2] += 1
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            # the last caller to give up drops the work if it has not
+            #  started yet; running work finishes for whoever asks next
+            if entry[2] == 1 and work.cancel():
+                self.forget(key, entry)
+                self.stats['cancelled'] += 1
+            raise
+        finally:
+            entry[2] -= 1
+
+    def forget(self, key, entry):
+        if self.in_flight.get(key) is entry:
+            del self.in_flight[key]
+
+    async def render_sheet(self, font_path, point_size, text_name, colors=None, blend_mode=None):
+        """Surface of one of the named texts, as font_viewer.render_sheet
+        draws it; colors are blended from the plain renders with a
+        blend_mode (see blend.py)"""
+        font_path = Path(font_path).absolute()
+        key = 'sheet', font_path, point_size, text_name, get_colors_key(colors), blend_mode
+        return await self.submit(key, self.draw_sheet, font_path, point_size, text_name, colors, blend_mode)
+
+    async def render_text(self, font_path, point_size, text, colors=None, tab_size=None, blend_mode=None):
+        """Surface of any text, laid out as the viewer lays out its texts"""
+        font_path = Path(font_path).absolute()
+        key = 'text', font_path, point_size, text, get_colors_key(colors), tab_size, blend_mode
+        return await self.submit(key, self.draw_text, font_path, point_size, text, colors, tab_size, blend_mode)
+
+    async def render_sheets(self, requests):
+        """Renders (font path, point size, text name) requests at once and
+        yields (request, surface) as each one finishes; whatever is left
+        is cancelled when the caller stops iterating"""
+        tasks = {asyncio.ensure_future(self.render_sheet(*request)): request for request in requests}
+        async for task in as_completed(tasks):
+            yield tasks[task], task.result()
+
+    async def export_bitmaps(self, font_path, output, point_sizes=None, text_names=None, font_name=None):
+        """Saves every point size of every sheet into output like
+        font_viewer.export_bitmaps, yielding each path once it is written"""
+        font_path = Path(font_path).absolute()
+        point_sizes = point_sizes or font_viewer.BITMAP_POINT_SIZES
+        text_names = text_names or font_viewer.BITMAP_SHEETS
+        font_name = font_name or font_path.stem
+        output.mkdir(parents=True, exist_ok=True)
+        tasks = [
+            asyncio.ensure_future(self.submit(
+                ('save', font_path, point_size, text_name, path), self.save_sheet, font_path, point_size, text_name, path,
+            ))
+            for point_size in point_sizes
+            for text_name in text_names
+            for path in [output / f'{font_name}-{point_size:>02}-{text_name}.png']
+        ]
+        async for task in as_completed(tasks):
+            yield task.result()
+
+
+async def as_completed(tasks):
+    """Yields tasks as they finish, cancelling the rest if the caller stops
+    early"""
+    pending = set(tasks)
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield task
+    finally:
+        for task in pending:
+            task.cancel()
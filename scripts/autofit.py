@@ -0,0 +1,80 @@
+"""
+Finds the largest point size at which a grid of character cells fits a
+resolution.
+
+Cell sizes come from the font's own metrics (the widest advance in hmtx
+and the hhea line height), so the answer is computed directly instead of
+by trying every point size, and answers are cached per resolution.
+"""
+
+import math
+from collections import namedtuple
+from functools import lru_cache
+from pathlib import Path
+
+from fontTools.ttLib import TTFont
+
+import bitmap_font
+
+CellMetrics = namedtuple('CellMetrics', 'advance, line_height, units_per_em')
+
+# cells as wide as they are tall, for when no font is at hand
+square_cell = CellMetrics(1, 1, 1)
+
+max_point_size = 72
+
+
+def read_cell_metrics(font):
+    hhea = font['hhea']
+    advance = max(advance for advance, left_side_bearing in font['hmtx'].metrics.values())
+    line_height = hhea.ascent - hhea.descent + hhea.lineGap
+    return CellMetrics(advance, line_height, font['head'].unitsPerEm)
+
+
+@lru_cache(maxsize=None)
+def load_cell_metrics(font_path):
+    if font_path.suffix.lower() in bitmap_font.suffixes:
+        # in pixels, with the sheet's point size as the em
+        font = bitmap_font.load_bitmap_font(font_path)
+        return CellMetrics(*font.cell_size, font.point_size)
+    return read_cell_metrics(TTFont(str(font_path), lazy=True))
+
+
+def get_cell_metrics(font):
+    """Cell advance and line height in font units"""
+    if isinstance(font, TTFont):
+        return read_cell_metrics(font)
+    return load_cell_metrics(Path(font).absolute())
+
+
+def scale(units, point_size, units_per_em):
+    """Font units to whole pixels, rounded the way FreeType rounds"""
+    return math.floor(units * point_size / units_per_em + 0.5)
+
+
+def get_cell_size(cell_metrics, point_size):
+    advance, line_height, units_per_em = cell_metrics
+    return scale(advance, point_size, units_per_em), scale(line_height, point_size, units_per_em)
+
+
+def fits(cell_metrics, point_size, resolution, dimensions):
+    cell_size = get_cell_size(cell_metrics, point_size)
+    return all(cells * pixels <= limit for cells, pixels, limit in zip(dimensions, cell_size, resolution))
+
+
+@lru_cache(maxsize=1024)
+def fit_point_size(cell_metrics, resolution, dimensions, max_point_size=max_point_size, min_point_size=1):
+    """Largest point size at which a (columns, rows) grid of cells fits
+    within a (width, height) resolution"""
+    advance, line_height, units_per_em = cell_metrics
+    columns, rows = (max(cells, 1) for cells in dimensions)
+    width, height = resolution
+    point_size = min(
+        width * units_per_em / (columns * max(advance, 1)),
+        height * units_per_em / (rows * max(line_height, 1)),
+    )
+    # rounding cells to whole pixels moves the answer by at most a point or so
+    point_size = min(math.floor(point_size) + 1, max_point_size)
+    while point_size > min_point_size and not fits(cell_metrics, point_size, resolution, (columns, rows)):
+        point_size -= 1
+    return max(point_size, min_point_size)
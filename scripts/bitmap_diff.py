@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Compares the bitmap sheets of two font revisions glyph by glyph.
+
+Usage: bitmap_diff.py [OPTIONS] [BASELINE] [REVISION]
+
+  BASELINE and REVISION may each be a font file, a folder of fonts or a
+  folder of exported sheets (<font>-<size>-<sheet>.png).
+
+  BASELINE defaults to <repo>/bitmaps and REVISION to <repo>/fonts, which
+  checks the committed bitmaps against the current fonts.
+
+Options:
+  -f, --font-name NAME    Font(s) to compare [default: Deferral-Regular, Deferral-Square]
+  -s, --sheet NAME        Sheet(s) to compare [default: cp437, cp850, glyphs]
+  -p, --point-size SIZE   Point size(s) to compare [default: 6-31]
+  -t, --tolerance LEVEL   Largest per-channel difference ignored [default: 0]
+  -o, --output PATH       Report folder [default: <repo>/bitmaps-diff]
+  --help                  Show this message and exit.
+
+Notes:
+    - writes <font>-<sheet>-heatmap.png (one row per point size, one column
+      per glyph cell) and changes.json (changed codepoints per size)
+    - glyphs are placed by their advances, so sheets are cut into glyph
+      cells where the font (the font at hand for exported sheets) places
+      each glyph, not on a uniform grid
+    - exits with 1 when any glyph changed so it can be used as a
+      golden-image test
+"""
+
+import importlib
+import json
+import sys
+from pathlib import Path
+
+import click
+import numpy as np
+import pygame
+
+font_viewer = importlib.import_module('font-viewer')
+
+font_suffixes = ('.ttf', '.otf')
+
+# heatmap colors
+unchanged = (32, 32, 32)
+missing = (0, 64, 192)
+
+
+def resolve_source(source, font_name):
+    """Finds the font file or the bitmaps folder that provides sheets for a
+    font name"""
+    source = Path(source)
+    if source.is_file():
+        return source
+    for suffix in font_suffixes:
+        font_path = source / f'{font_name}{suffix}'
+        if font_path.exists():
+            return font_path
+    return source
+
+
+def surface_to_array(surface):
+    """Copies a surface's pixels into a (height, width, 3) array"""
+    return pygame.surfarray.array3d(surface).swapaxes(0, 1)
+
+
+def load_cells(source, font_name, point_size, text_name, glyphs, renders=None, layout_font=None):
+    """Loads or renders a sheet and slices it into one bitmap per glyph cell;
+    sheets rendered at the same point size can share renders.  Exported
+    sheets are sliced where layout_font places their glyphs, or on the
+    cell grid without one
+
+    Returns (codes, cells) where cells has shape (count, height, width, 3),
+    or None if the sheet does not exist
+    """
+    offsets = []
+    if source.suffix in font_suffixes:
+        surface = font_viewer.render_sheet(source, point_size, text_name, glyphs=glyphs, renders=renders, offsets=offsets)
+    else:
+        sheet_path = source / f'{font_name}-{point_size:>02}-{text_name}.png'
+        if not sheet_path.exists():
+            return None
+        surface = pygame.image.load(str(sheet_path))
+        if layout_font:
+            offsets = font_viewer.get_sheet_offsets(layout_font, point_size, text_name, glyphs, renders)
+    return slice_cells(surface_to_array(surface), text_name, glyphs, offsets or None)
+
+
+def slice_cells(array, text_name, glyphs, offsets=None):
+    """Slices a sheet's (height, width, 3) pixels into one bitmap per glyph
+    cell, returning (codes, cells) like load_cells.  Glyphs are placed by
+    their advances, so cells are cut at the x of every glyph given offsets
+    from font_viewer.get_line_offsets, and padded to the widest; without
+    them cells are cut on a uniform grid, which only gives per-glyph
+    results when every advance is the cell width"""
+    codes, columns = font_viewer.get_sheet_codes(text_name, glyphs)
+    rows = -(-len(codes) // columns)
+    cell_height, cell_width = array.shape[0] // rows, array.shape[1] // columns
+    if offsets is None:
+        array = array[:rows * cell_height, :columns * cell_width]
+        cells = array.reshape(rows, cell_height, columns, cell_width, 3).swapaxes(1, 2)
+        cells = cells.reshape(rows * columns, cell_height, cell_width, 3)[:len(codes)]
+        return np.asarray(codes, dtype=np.uint32), cells
+
+    spans = [offsets[index // columns][index % columns:index % columns + 2] for index in range(len(codes))]
+    width = max((end - start for start, end in spans), default=0)
+    cells = np.zeros((len(codes), cell_height, width, 3), dtype=np.uint8)
+    for index, (start, end) in enumerate(spans):
+        top = index // columns * cell_height
+        pixels = array[top:top + cell_height, start:end]
+        cells[index, :pixels.shape[0], :pixels.shape[1]] = pixels
+    return np.asarray(codes, dtype=np.uint32), cells
+
+
+def occurrence_keys(codes):
+    """Numbers repeated codepoints so every cell of a sheet has a unique key"""
+    order = np.argsort(codes, kind='stable')
+    sorted_codes = codes[order]
+    starts = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]])
+    ranks = np.arange(len(codes)) - np.repeat(starts, np.diff(np.r_[starts, len(codes)]))
+    keys = np.empty(len(codes), dtype=np.uint64)
+    keys[order] = (sorted_codes.astype(np.uint64) << np.uint64(8)) | ranks.astype(np.uint64)
+    return keys
+
+
+def pad_cells(cells, height, width):
+    """Pads cells with background so both revisions share a cell size"""
+    pad_height, pad_width = height - cells.shape[1], width - cells.shape[2]
+    if not (pad_height or pad_width):
+        return cells
+    return np.pad(cells, ((0, 0), (0, pad_height), (0, pad_width), (0, 0)))
+
+
+def diff_cells(baseline, revision, tolerance=0):
+    """Compares two sliced sheets cell by cell
+
+    Returns (codes, fractions): the codepoints of the baseline layout
+    followed by any added in the revision, and the fraction of pixels
+    that changed in each of those cells (1.0 for added/removed glyphs)
+    """
+    codes_a, cells_a = baseline
+    codes_b, cells_b = revision
+    height = max(cells_a.shape[1], cells_b.shape[1])
+    width = max(cells_a.shape[2], cells_b.shape[2])
+    cells_a = pad_cells(cells_a, height, width)
+    cells_b = pad_cells(cells_b, height, width)
+
+    # codepages may repeat a codepoint, so the nth cell of a codepoint in
+    #  the baseline is matched with the nth cell of it in the revision
+    keys_a, keys_b = occurrence_keys(codes_a), occurrence_keys(codes_b)
+    order_b = np.argsort(keys_b)
+    sorted_b = keys_b[order_b]
+    position = np.minimum(np.searchsorted(sorted_b, keys_a), len(sorted_b) - 1)
+    index_a = np.flatnonzero(sorted_b[position] == keys_a)
+    index_b = order_b[position[index_a]]
+    delta = np.abs(cells_a[index_a].astype(np.int16) - cells_b[index_b].astype(np.int16))
+    changed_pixels = (delta.max(axis=-1) > tolerance).sum(axis=(1, 2))
+
+    fractions = np.ones(len(codes_a))
+    fractions[index_a] = changed_pixels / (height * width)
+    added = np.setdiff1d(codes_b, codes_a)
+    codes = np.concatenate([codes_a, added])
+    fractions = np.concatenate([fractions, np.ones(len(added))])
+    return codes, fractions
+
+
+def heatmap_surface(rows, scale):
+    """Draws one row per point size and one column per glyph cell"""
+    width = max((len(fractions) for fractions in rows if fractions is not None), default=1)
+    image = np.zeros((len(rows), width, 3), dtype=np.uint8)
+    image[:] = unchanged
+    for index, fractions in enumerate(rows):
+        if fractions is None:
+            image[index] = missing
+            continue
+        changed = fractions > 0
+        image[index, :len(fractions)][changed] = 0
+        image[index, :len(fractions)][changed, 0] = 96 + (159 * fractions[changed]).astype(np.uint8)
+    image = image.repeat(scale, axis=0).repeat(scale, axis=1)
+    return pygame.surfarray.make_surface(image.swapaxes(0, 1))
+
+
+@click.command()
+@click.argument('baseline', required=False, type=click.Path(exists=True, path_type=Path))
+@click.argument('revision', required=False, type=click.Path(exists=True, path_type=Path))
+@click.option('-f', '--font-name', 'font_names', metavar='NAME', multiple=True, help='Font(s) to compare')
+@click.option('-s', '--sheet', 'sheets', metavar='NAME', multiple=True, help='Sheet(s) to compare')
+@click.option('-p', '--point-size', 'point_sizes', metavar='SIZE', multiple=True, type=int, help='Point size(s) to compare')
+@click.option('-t', '--tolerance', metavar='LEVEL', default=0, type=int, help='Largest per-channel difference ignored')
+@click.option('-o', '--output', metavar='PATH', type=click.Path(path_type=Path), help='Report folder')
+@click.option('--scale', metavar='PIXELS', default=4, type=int, help='Heatmap pixels per cell')
+def main(baseline, revision, font_names, sheets, point_sizes, tolerance, output, scale):
+    baseline = baseline or font_viewer.this_repo / 'bitmaps'
+    revision = revision or font_viewer.this_repo / 'fonts'
+    font_names = font_names or font_viewer.BITMAP_FONTS
+    sheets = sheets or font_viewer.BITMAP_SHEETS
+    point_sizes = point_sizes or font_viewer.BITMAP_POINT_SIZES
+    output = output or font_viewer.this_repo / 'bitmaps-diff'
+    output.mkdir(parents=True, exist_ok=True)
+
+    font_viewer.init_headless()
+
+    report = {}
+    changed_total = 0
+    for font_name in font_names:
+        sources = [resolve_source(baseline, font_name), resolve_source(revision, font_name)]
+        font_paths = [source for source in sources if source.suffix in font_suffixes]
+        font_path = font_paths[-1] if font_paths else font_viewer.find_font(font_name)
+        # each font lays out its own glyphs; exported sheets are laid out,
+        #  and sliced, as the font at hand places them
+        layout_fonts = [source if source.suffix in font_suffixes else font_path for source in sources]
+        source_glyphs = [font_viewer.cmap.get_cmap_index(layout_font) for layout_font in layout_fonts]
+
+        # every sheet of a point size is drawn from the same renders, as
+        #  export_bitmaps draws them, but each font from its own
+        sheet_rows = {text_name: [] for text_name in sheets}
+        for point_size in point_sizes:
+            font_renders = {layout_font: {} for layout_font in layout_fonts}
+            for text_name in sheets:
+                sheet_report = report.setdefault(font_name, {}).setdefault(text_name, {})
+                pair = [
+                    load_cells(source, font_name, point_size, text_name, glyphs, font_renders[layout_font], layout_font)
+                    for source, glyphs, layout_font in zip(sources, source_glyphs, layout_fonts)
+                ]
+                if None in pair:
+                    sheet_report[point_size] = None
+                    sheet_rows[text_name].append(None)
+                    continue
+                codes, fractions = diff_cells(*pair, tolerance=tolerance)
+                changed = codes[fractions > 0]
+                sheet_report[point_size] = [f'U+{code:04X}' for code in changed]
+                changed_total += len(changed)
+                sheet_rows[text_name].append(fractions)
+
+        for text_name, rows in sheet_rows.items():
+            heatmap_path = output / f'{font_name}-{text_name}-heatmap.png'
+            pygame.image.save(heatmap_surface(rows, scale), str(heatmap_path))
+
+    with (output / 'changes.json').open('w') as stream:
+        json.dump(report, stream, indent=2)
+
+    click.echo(f'{changed_total} changed glyph cells; report written to {output}')
+    sys.exit(1 if changed_total else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+"""
+Bitmap fonts read back from exported codepage sheets.
+
+A sheet (<font>-<size>-<sheet>.png) is the 16x16 codepage table drawn one
+cell per byte, so slicing it on that grid, the way bitmap_diff does, gives
+the bitmap of every character in the table.  Glyphs are sliced once per
+sheet and kept as gray coverage; render colors them on demand and returns
+surfaces like pygame.font.Font.render, so sheets, tiles and exports can be
+drawn from prebuilt bitmaps without rasterizing TrueType at all.
+"""
+
+import re
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+import pygame
+
+import codepages
+import layout
+
+suffixes = ('.png', '.bmp')
+
+# <font>-<point size>-<sheet>, as exported
+sheet_pattern = re.compile(r'^(?P<font_name>.+)-(?P<point_size>\d+)-(?P<sheet_name>[^-]+)$')
+
+# layout of an image that is not named like an exported sheet
+default_sheet_name = 'cp437'
+
+white = (255, 255, 255)
+
+
+def parse_sheet_path(path):
+    """Font name, point size and sheet name of an exported sheet; the point
+    size is None for any other image"""
+    match = sheet_pattern.match(Path(path).stem)
+    if not match:
+        return Path(path).stem, None, default_sheet_name
+    return match['font_name'], int(match['point_size']), match['sheet_name']
+
+
+def find_sheet(path, point_size=None):
+    """The sheet exported next to path at point_size, or path itself"""
+    path = Path(path)
+    font_name, sheet_point_size, sheet_name = parse_sheet_path(path)
+    if point_size and sheet_point_size is not None:
+        sibling = path.with_name(f'{font_name}-{point_size:>02}-{sheet_name}{path.suffix}')
+        if sibling.exists():
+            return sibling
+    return path
+
+
+class BitmapFont(object):
+    """Gray coverage (rows, columns) of every character of a sheet, all one
+    cell in size"""
+
+    def __init__(self, coverage, cell_size, point_size):
+        self.coverage = coverage
+        self.cell_size = cell_size
+        self.point_size = point_size
+        self.blank = np.zeros(cell_size[::-1], dtype=np.uint8)
+
+    @classmethod
+    def from_sheet(cls, path):
+        font_name, point_size, sheet_name = parse_sheet_path(path)
+        try:
+            table = codepages.get_codepage(sheet_name)
+        except LookupError:
+            raise ValueError(f'{path} is not a codepage sheet, it cannot be sliced into glyphs') from None
+        rows, columns = table.shape
+
+        pixels = pygame.surfarray.array3d(pygame.image.load(str(path))).max(axis=2).T
+        cell_width, row_height = pixels.shape[1] // columns, pixels.shape[0] // rows
+        # rows of a sheet overlap by a pixel: each glyph gets a blank row
+        #  at the bottom so that drawing them the same way gives the sheet
+        cell_size = cell_width, row_height + 1
+
+        coverage = {}
+        for (row, column), code in np.ndenumerate(table):
+            character = chr(code).translate(layout.control_translation)
+            if code == 0 or (character == ' ' and code != 0x20) or character in coverage:
+                continue
+            cell = np.zeros(cell_size[::-1], dtype=np.uint8)
+            cell[:row_height] = pixels[row * row_height:(row + 1) * row_height, column * cell_width:(column + 1) * cell_width]
+            coverage[character] = cell
+        return cls(coverage, cell_size, point_size or row_height)
+
+    @property
+    def characters(self):
+        return sorted(self.coverage)
+
+    def get_height(self):
+        return self.cell_size[1]
+
+    def get_linesize(self):
+        return self.cell_size[1]
+
+    def size(self, text):
+        return len(text) * self.cell_size[0], self.cell_size[1]
+
+    def render(self, text, antialias, color, background=None):
+        """Surface of text, a cell per character; characters the sheet has
+        no glyph for are blank"""
+        coverage = np.hstack([self.coverage.get(character, self.blank) for character in text] or [self.blank[:, :0]])
+        if not antialias:
+            coverage = np.where(coverage >= 128, 255, 0).astype(np.uint8)
+        color = np.array(pygame.Color(color)[:3], dtype=np.int32)
+        width, height = coverage.shape[1], coverage.shape[0]
+
+        if background is None:
+            surface = pygame.Surface((width, height), pygame.SRCALPHA)
+            surface.fill(tuple(color))
+            pygame.surfarray.pixels_alpha(surface)[:] = coverage.T
+            return surface
+        background = np.array(pygame.Color(background)[:3], dtype=np.int32)
+        pixels = background + ((color - background) * coverage[..., None].astype(np.int32) + 127) // 255
+        surface = pygame.Surface((width, height))
+        pygame.surfarray.blit_array(surface, pixels.astype(np.uint8).transpose(1, 0, 2))
+        return surface
+
+
+@lru_cache(maxsize=64)
+def load_sheet(path, modified):
+    return BitmapFont.from_sheet(path)
+
+
+def load_bitmap_font(path, point_size=None):
+    """Font of the sheet exported next to path at point_size, or of path
+    itself; sheets are sliced once for as long as the file is unchanged"""
+    path = find_sheet(Path(path).absolute(), point_size)
+    return load_sheet(path, path.stat().st_mtime_ns)
@@ -0,0 +1,82 @@
+"""
+Coverage blending for colored sheets.
+
+Glyphs are rasterized once, white on black, which makes their pixels the
+coverage of each glyph.  A colored sheet is then that coverage looked up
+in a table per color: 256 coverage levels of the color blended over the
+background.  'gamma' blends in linear light (sRGB is decoded, blended and
+encoded again), so thin strokes keep their weight in every color; 'direct'
+blends the sRGB values themselves and gives exactly what SDL_ttf renders
+in color.  Recoloring a sheet, or changing its background, is then one
+array lookup rather than rendering every glyph again.
+"""
+
+import numpy as np
+import pygame
+
+modes = ('gamma', 'direct')
+
+coverage_levels = np.arange(256).reshape(1, -1, 1)
+
+# blended rows of the table per (color, background, mode), 768 bytes each
+luts = {}
+max_luts = 16384
+
+
+def srgb_to_linear(values):
+    values = np.asarray(values, dtype=np.float64) / 255
+    return np.where(values <= 0.04045, values / 12.92, ((values + 0.055) / 1.055) ** 2.4)
+
+
+def linear_to_srgb(values):
+    values = np.clip(values, 0, 1)
+    return np.where(values <= 0.0031308, values * 12.92, 1.055 * values ** (1 / 2.4) - 0.055) * 255
+
+
+def blend(foregrounds, background, mode='gamma'):
+    """(colors, 256, 3) of every coverage level of each foreground over the
+    background"""
+    foregrounds = np.asarray(foregrounds, dtype=np.float64).reshape(-1, 1, 3)
+    background = np.asarray(background, dtype=np.float64).reshape(1, 1, 3)
+    if mode == 'gamma':
+        alpha = coverage_levels / 255
+        linear = srgb_to_linear(foregrounds) * alpha + srgb_to_linear(background) * (1 - alpha)
+        return np.floor(linear_to_srgb(linear) + 0.5).astype(np.uint8)
+    if mode == 'direct':
+        # SDL_ttf's palette: whole steps from the background, truncated
+        steps = np.trunc((foregrounds - background) * coverage_levels / 255)
+        return (background + steps).astype(np.uint8)
+    raise ValueError(f'blend mode must be one of {", ".join(modes)}, not {mode!r}')
+
+
+def get_lut(palette, background, mode='gamma'):
+    """Table (colors, 256, 3) for the colors of a palette; rows are blended
+    once per color and background"""
+    background = tuple(background)
+    missing = [color for color in dict.fromkeys(palette) if (color, background, mode) not in luts]
+    if missing:
+        if len(luts) + len(missing) > max_luts:
+            luts.clear()
+        for color, row in zip(missing, blend(missing, background, mode)):
+            luts[color, background, mode] = row
+    return np.stack([luts[color, background, mode] for color in palette])
+
+
+def colorize(coverage, owners, palette, background, mode='gamma'):
+    """Colors coverage (any shape) in one pass: each pixel takes the color
+    at its index in owners"""
+    return get_lut(palette, background, mode)[owners, coverage]
+
+
+def colorize_surface(surface, cells, palette, background, mode='gamma'):
+    """Colors a surface of white on black glyphs in place.  cells are the
+    (x, y, width, height, palette index) of every glyph in the order they
+    were drawn, so a glyph owns the pixels it was last to draw over; pixels
+    no glyph drew over are background"""
+    owners = np.zeros(surface.get_size(), dtype=np.uint16)
+    for x, y, width, height, index in cells:
+        owners[x:x + width, y:y + height] = index
+    coverage = pygame.surfarray.pixels_red(surface)
+    pixels = colorize(coverage, owners, palette, background, mode)
+    del coverage
+    pygame.surfarray.blit_array(surface, pixels)
@@ -0,0 +1,173 @@
+"""
+Keeps the memory held by cached surfaces and glyph bitmaps under a cap.
+
+Caches register every entry they keep along with a callback that drops
+it.  When the total goes over the cap, the least recently used entries of
+any cache are dropped until it fits again.  Current and peak bytes are
+kept per cache for the stats overlay and the --stats dump.
+"""
+
+import sys
+from collections import Counter, OrderedDict
+
+import numpy as np
+
+megabyte = 1024 * 1024
+
+# bytes all caches may hold together
+default_cap = 256 * megabyte
+
+
+def get_size(item):
+    """Bytes held by a surface or an array"""
+    if isinstance(item, np.ndarray):
+        return item.nbytes
+    return item.get_pitch() * item.get_height()
+
+
+def get_peak_rss():
+    """Peak resident memory of the whole process in bytes, or None where
+    the resource module is missing (Windows)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class SurfaceBudget(object):
+    """Sizes of every registered entry, in least recently used order"""
+
+    def __init__(self, cap=default_cap):
+        self.cap = cap
+        self.entries = OrderedDict()  # (cache, key): (bytes, drop or None)
+        self.usage = Counter()
+        self.peak_usage = Counter()
+        self.evictions = Counter()
+        self.total = 0
+        self.peak_total = 0
+
+    def add(self, cache, key, item, drop=None):
+        """Registers an entry of cache; drop(key) is called to evict it, and
+        entries without one (e.g. the screen) are never evicted"""
+        self.remove(cache, key)
+        size = get_size(item)
+        self.entries[cache, key] = size, drop
+        self.usage[cache] += size
+        self.total += size
+        self.peak_usage[cache] = max(self.peak_usage[cache], self.usage[cache])
+        self.peak_total = max(self.peak_total, self.total)
+        self.enforce(keep=(cache, key))
+        return item
+
+    def touch(self, cache, key):
+        if (cache, key) in self.entries:
+            self.entries.move_to_end((cache, key))
+
+    def remove(self, cache, key):
+        """Forgets an entry that its cache dropped by itself"""
+        entry = self.entries.pop((cache, key), None)
+        if entry:
+            self.usage[cache] -= entry[0]
+            self.total -= entry[0]
+
+    def release(self, cache):
+        """Forgets every entry of a cache that is being thrown away"""
+        for entry_cache, key in [entry for entry in self.entries if entry[0] == cache]:
+            self.remove(entry_cache, key)
+
+    def enforce(self, keep=None):
+        """Drops least recently used entries until the total fits the cap;
+        keep is never dropped"""
+        if self.cap is None or self.total <= self.cap:
+            return
+        for cache, key in list(self.entries):
+            if self.total <= self.cap:
+                break
+            size, drop = self.entries[cache, key]
+            if drop is None or (cache, key) == keep:
+                continue
+            self.remove(cache, key)
+            self.evictions[cache] += 1
+            drop(key)
+
+    def get_stats(self):
+        caches = sorted(set(self.usage) | set(self.peak_usage))
+        return {
+            'cap': self.cap,
+            'total': self.total,
+            'peak_total': self.peak_total,
+            'peak_rss': get_peak_rss(),
+            'caches': {
+                cache: {
+                    'bytes': self.usage[cache],
+                    'peak_bytes': self.peak_usage[cache],
+                    'entries': sum(1 for entry_cache, key in self.entries if entry_cache == cache),
+                    'evictions': self.evictions[cache],
+                }
+                for cache in caches
+            },
+        }
+
+    def format_stats(self):
+        """Stats as lines of text"""
+        stats = self.get_stats()
+        cap = f'{stats["cap"] / megabyte:.0f}MB' if stats['cap'] is not None else 'none'
+        rss = f'{stats["peak_rss"] / megabyte:.0f}MB' if stats['peak_rss'] is not None else 'unknown'
+        lines = [
+            f'surfaces {stats["total"] / megabyte:.1f}MB (peak {stats["peak_total"] / megabyte:.1f}MB, cap {cap}), '
+            f'process peak {rss}'
+        ]
+        for cache, cache_stats in stats['caches'].items():
+            lines.append(
+                f'  {cache}: {cache_stats["bytes"] / megabyte:.1f}MB in {cache_stats["entries"]} '
+                f'(peak {cache_stats["peak_bytes"] / megabyte:.1f}MB, {cache_stats["evictions"]} evicted)'
+            )
+        return lines
+
+
+# shared by everything drawn in one process
+default_budget = SurfaceBudget()
+
+
+class BudgetedDict(dict):
+    """A dict of surfaces (or None) that registers every surface with a
+    budget, which may evict any of them; for caches such as glyph renders
+    that are filled by code expecting a plain dict"""
+
+    def __init__(self, cache, surface_budget=None):
+        super().__init__()
+        self.cache = cache
+        self.budget = surface_budget or default_budget
+
+    def __getitem__(self, key):
+        item = super().__getitem__(key)
+        self.budget.touch(self.cache, (id(self), key))
+        return item
+
+    def __setitem__(self, key, item):
+        super().__setitem__(key, item)
+        if item is None:
+            self.budget.remove(self.cache, (id(self), key))
+        else:
+            self.budget.add(self.cache, (id(self), key), item, self.drop)
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self.budget.remove(self.cache, (id(self), key))
+
+    def pop(self, key, *default):
+        self.budget.remove(self.cache, (id(self), key))
+        return super().pop(key, *default)
+
+    def drop(self, key):
+        """Forgets an entry that the budget evicted"""
+        owner, key = key
+        super().pop(key, None)
+
+    def release(self):
+        """Forgets every entry, for when the cache is thrown away"""
+        for key in self:
+            self.budget.remove(self.cache, (id(self), key))
+        self.clear()
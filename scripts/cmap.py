@@ -0,0 +1,128 @@
+"""
+Array-backed index of a font's character map.
+
+The Unicode cmap subtables are merged once, the preferred subtable winning
+wherever they disagree, into arrays of codepoint, glyph id and advance
+sorted by codepoint.  Every codepoint a glyph is mapped from is kept, so
+aliases survive, and lookups in either direction are binary searches.
+"""
+
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+from fontTools.ttLib import TTFont
+
+import bitmap_font
+
+# Unicode subtables as (platform, encoding), most preferred first: full
+#  repertoire before BMP only, Windows before the Unicode platform and the
+#  Windows symbol encoding last.  Other subtables (e.g. Mac Roman) map
+#  legacy character codes, not codepoints, and are left out.
+subtable_precedence = ((3, 10), (0, 6), (0, 4), (3, 1), (0, 3), (0, 2), (0, 1), (0, 0), (3, 0))
+
+
+class CmapIndex(object):
+    """Codepoints of a font with the glyph id and advance each maps to"""
+
+    def __init__(self, codepoints, glyph_ids, glyph_names, advances):
+        self.codepoints = codepoints
+        self.glyph_ids = glyph_ids
+        self.glyph_names = glyph_names
+        self.advances = advances[glyph_ids] if len(glyph_ids) else np.zeros(0, dtype=np.int32)
+        self.name_ids = {name: glyph_id for glyph_id, name in enumerate(glyph_names)}
+        # positions sorted by glyph id, for glyph to codepoint lookups
+        self.by_glyph = np.argsort(glyph_ids, kind='stable')
+        self.sorted_glyph_ids = glyph_ids[self.by_glyph]
+        self.codepoints.flags.writeable = False
+        self.glyph_ids.flags.writeable = False
+
+    @classmethod
+    def from_font(cls, font):
+        glyph_names = font.getGlyphOrder()
+        glyph_ids = {name: glyph_id for glyph_id, name in enumerate(glyph_names)}
+        subtables = {(table.platformID, table.platEncID): table for table in font['cmap'].tables}
+
+        mapping = {}
+        for key in reversed(subtable_precedence):
+            if key in subtables:
+                mapping.update(subtables[key].cmap)
+        codepoints = np.fromiter(sorted(mapping), dtype=np.uint32, count=len(mapping))
+        ids = np.array([glyph_ids.get(mapping[code], 0) for code in codepoints.tolist()], dtype=np.uint32)
+        hmtx = font['hmtx']
+        advances = np.array([hmtx[name][0] for name in glyph_names], dtype=np.int32)
+        return cls(codepoints, ids, glyph_names, advances)
+
+    @classmethod
+    def from_bitmap_font(cls, font):
+        """Index of a bitmap_font.BitmapFont, a glyph per character"""
+        codepoints = np.array([ord(character) for character in font.characters], dtype=np.uint32)
+        glyph_names = [f'uni{code:04X}' if code <= 0xFFFF else f'u{code:05X}' for code in codepoints.tolist()]
+        advances = np.full(len(codepoints), font.cell_size[0], dtype=np.int32)
+        return cls(codepoints, np.arange(len(codepoints), dtype=np.uint32), glyph_names, advances)
+
+    def __len__(self):
+        return len(self.codepoints)
+
+    def __contains__(self, codepoint):
+        return self.find(codepoint) is not None
+
+    def find(self, codepoint):
+        """Position of a codepoint in the index, or None"""
+        position = int(np.searchsorted(self.codepoints, codepoint))
+        if position < len(self.codepoints) and self.codepoints[position] == codepoint:
+            return position
+        return None
+
+    def get_glyph_id(self, codepoint):
+        position = self.find(codepoint)
+        return None if position is None else int(self.glyph_ids[position])
+
+    def get_glyph_name(self, codepoint):
+        glyph_id = self.get_glyph_id(codepoint)
+        return None if glyph_id is None else self.glyph_names[glyph_id]
+
+    def get_glyph_ids(self, codepoints):
+        """Glyph id of each of an array of codepoints, -1 where unmapped"""
+        codepoints = np.asarray(codepoints, dtype=np.uint32)
+        if not len(self.codepoints):
+            return np.full(codepoints.shape, -1, dtype=np.int64)
+        positions = np.minimum(np.searchsorted(self.codepoints, codepoints), len(self.codepoints) - 1)
+        found = self.codepoints[positions] == codepoints
+        return np.where(found, self.glyph_ids[positions].astype(np.int64), -1)
+
+    def get_codepoints(self, glyph):
+        """Every codepoint mapped to a glyph (by id or name), sorted"""
+        glyph_id = glyph if isinstance(glyph, int) else self.name_ids[glyph]
+        first, last = np.searchsorted(self.sorted_glyph_ids, [glyph_id, glyph_id + 1])
+        return np.sort(self.codepoints[self.by_glyph[first:last]])
+
+    def select(self, first=None, last=None):
+        """Codepoints in [first, last)"""
+        start = 0 if first is None else np.searchsorted(self.codepoints, first)
+        stop = len(self.codepoints) if last is None else np.searchsorted(self.codepoints, last)
+        return self.codepoints[start:stop]
+
+    def get_glyph_names(self):
+        """Glyph name of every codepoint, in codepoint order"""
+        return [self.glyph_names[glyph_id] for glyph_id in self.glyph_ids.tolist()]
+
+
+@lru_cache(maxsize=32)
+def load_cmap_index(font_path, modified):
+    if font_path.suffix.lower() in bitmap_font.suffixes:
+        return CmapIndex.from_bitmap_font(bitmap_font.load_bitmap_font(font_path))
+    return CmapIndex.from_font(TTFont(str(font_path), lazy=True))
+
+
+def get_cmap_index(font):
+    """Index of a font, a TTFont, a bitmap font or a path; paths are read
+    once for as long as the file is unchanged"""
+    if isinstance(font, CmapIndex):
+        return font
+    if isinstance(font, TTFont):
+        return CmapIndex.from_font(font)
+    if isinstance(font, bitmap_font.BitmapFont):
+        return CmapIndex.from_bitmap_font(font)
+    font_path = Path(font).absolute()
+    return load_cmap_index(font_path, font_path.stat().st_mtime_ns)
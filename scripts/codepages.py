@@ -0,0 +1,99 @@
+"""
+Codepage tables generated from Python's single-byte codecs.
+
+Every table is a read-only 16x16 array of the Unicode codepoints drawn for
+each byte; 0 marks a byte with nothing to draw (NUL, control characters
+and unassigned bytes).
+"""
+
+import codecs
+import encodings
+import importlib
+import pkgutil
+from functools import lru_cache
+
+import click
+import numpy as np
+
+# DOS (OEM) codepages draw the CP437 symbols for the control bytes; cp874
+#  (Thai) and cp875 (EBCDIC Greek) are not among them
+oem_codepages = (
+    'cp437', 'cp720', 'cp737', 'cp775', 'cp850', 'cp852', 'cp855', 'cp856', 'cp857', 'cp858',
+    'cp860', 'cp861', 'cp862', 'cp863', 'cp864', 'cp865', 'cp866', 'cp869', 'cp1125',
+)
+oem_controls = (
+    0x0000, 0x263A, 0x263B, 0x2665, 0x2666, 0x2663, 0x2660, 0x2022, 0x25D8, 0x25CB, 0x25D9, 0x2642, 0x2640, 0x266A, 0x266B, 0x263C,
+    0x25BA, 0x25C4, 0x2195, 0x203C, 0x00B6, 0x00A7, 0x25AC, 0x21A8, 0x2191, 0x2193, 0x2192, 0x2190, 0x221F, 0x2194, 0x25B2, 0x25BC,
+)
+oem_delete = 0x2302
+
+# listed first; the rest follow alphabetically
+preferred_codepages = ('cp437', 'cp850')
+
+
+@lru_cache(maxsize=None)
+def get_codepage_names():
+    """Names of every codec that maps 256 bytes onto single characters"""
+    names = []
+    for module_info in pkgutil.iter_modules(encodings.__path__):
+        try:
+            module = importlib.import_module(f'encodings.{module_info.name}')
+        except ImportError:
+            continue
+        decoding_table = getattr(module, 'decoding_table', None)
+        if isinstance(decoding_table, str) and len(decoding_table) == 256:
+            names.append(module_info.name)
+    return tuple(sorted(names, key=lambda name: (name not in preferred_codepages, name)))
+
+
+@lru_cache(maxsize=None)
+def normalize_codepage_name(name):
+    """Module name of a single-byte codec (CP437 is cp437, iso8859-5 is
+    iso8859_5), which names its sheets; LookupError for any other codec"""
+    normalized = codecs.lookup(name).name.replace('-', '_')
+    if normalized not in get_codepage_names():
+        raise LookupError(f'{name} is not a single-byte codepage')
+    return normalized
+
+
+@lru_cache(maxsize=None)
+def get_codepage(name):
+    """The 16x16 grid of codepoints for a codec"""
+    name = normalize_codepage_name(name)
+    decoding_table = importlib.import_module(f'encodings.{name}').decoding_table
+    codes = np.fromiter(map(ord, decoding_table), dtype=np.uint32, count=256)
+    codes[codes == 0xFFFE] = 0
+    codes[(codes < 0x20) | ((codes >= 0x7F) & (codes < 0xA0))] = 0
+    if name in oem_codepages:
+        codes[:0x20] = oem_controls
+        codes[0x7F] = oem_delete
+    table = codes.astype(np.uint16).reshape(16, 16)
+    table.setflags(write=False)
+    return table
+
+
+def get_codepages(names=None):
+    """Maps normalized codepage names to tables; 'all' selects every
+    codepage.  Names come from --codepage options, so an unknown or
+    multi-byte codec is reported as a bad parameter"""
+    names = names or preferred_codepages
+    if 'all' in names:
+        names = get_codepage_names()
+    try:
+        return {normalize_codepage_name(name): get_codepage(name) for name in names}
+    except LookupError as error:
+        raise click.BadParameter(str(error), param_hint="'-c' / '--codepage'") from None
+
+
+def get_codepage_codepoints(table):
+    """Distinct codepoints a codepage table needs glyphs for"""
+    codes = np.asarray(table, dtype=np.uint32).ravel()
+    return np.unique(codes[codes != 0])
+
+
+def get_missing(table, codepoints):
+    """Positions (index into the flattened table) and codepoints of a
+    codepage that are not among a font's codepoints"""
+    codes = np.asarray(table, dtype=np.uint32).ravel()
+    positions = np.flatnonzero((codes != 0) & ~np.isin(codes, np.asarray(codepoints, dtype=np.uint32)))
+    return positions, codes[positions]
@@ -8,34 +8,70 @@ Options:
   -f, --font-name NAME   Font to use [default: Deferral-Regular]
   -o, --output PATH      Save path [default: <repo>/bitmaps]
   -p, --point-size SIZE  Initial font-point to use [default: 6]
+  -c, --codepage NAME    Codepage(s) to show or export; any single-byte
+                         Python codec, or "all" [default: cp437, cp850]
+  -e, --export           Save every size of every sheet and exit
+  -g, --grid COLUMNSxROWS
+                         Fit a grid of characters (e.g. 80x50) to the window
+  -s, --source PATH      Show a Python file, highlighted, as the code text;
+                         it is reloaded whenever it changes
+  -m, --memory-cap MB    Memory cached surfaces may hold together
+                         [default: 256]
+  --stats                Print memory stats on exit
   --help                 Show this message and exit.
 
 Notes:
     - developed on Mac.  Untested elsewhere
+    - FONT may also be an exported codepage sheet (.png/.bmp), which is
+      sliced into a bitmap font (see bitmap_font.py)
 
 Keyboard shortcuts:
 
     Mac OS X:
 
-        CMD + S:  Save the current screen to the output folder
+        CMD + E:  Save the current screen to the output folder
+        CMD + X:  Remove every bitmap from <repo>/bitmaps
         CMD + =:  increase the font size
         CMD + -:  decrease the font size
 
+        arrows: scroll a cell at a time
+        page up/down, home/end: scroll a screen at a time, to the top/bottom
         t: Change the text displayed
-        c: Toggle colors on/off [default: on]
+        g: Reload the glyphs from the font
+        c: Toggle colors on/off [default: off]
+        b: Toggle blending colors in linear light (gamma correct) or, as
+           SDL_ttf does, on sRGB values [default: gamma correct]
+        h: Toggle syntax highlighting of the code text [default: on]
+        i: Toggle the glyph inspector: hover a cell for its codepoint,
+           glyph, advance and bounds
+        m: Toggle the memory stats overlay
         space: modify colors (when colors are toggled on)
+        q, escape: Quit
 """
 
 import itertools
 import os
 import sys
 import random
+import time
 from pathlib import Path
 
 import click
 import pygame
 from fontTools.ttLib import TTFont
 from colors import colors as color_data
+from viewer import Viewer
+import autofit
+import bitmap_font
+import blend
+import budget
+import cmap
+import codepages
+import highlight
+import inspector
+import layout
+import metrics
+import tiles
 
 # pygame currently doesn't allow 32-bit unicodes
 MAX_PYGAME_UNICODE = 0xFFFF
@@ -46,39 +82,8 @@ this_files_folder = this_file.parent
 this_repo = this_files_folder.parent
 
 
-cp437_table = [
-    (0x0000, 0x263A, 0x263B, 0x2665, 0x2666, 0x2663, 0x2660, 0x2022, 0x25D8, 0x25CB, 0x25D9, 0x2642, 0x2640, 0x266A, 0x266B, 0x263C),
-    (0x25BA, 0x25C4, 0x2195, 0x203C, 0x00B6, 0x00A7, 0x25AC, 0x21A8, 0x2191, 0x2193, 0x2192, 0x2190, 0x221F, 0x2194, 0x25B2, 0x25BC),
-    (0x0020, 0x0021, 0x0022, 0x0023, 0x0024, 0x0025, 0x0026, 0x0027, 0x0028, 0x0029, 0x002A, 0x002B, 0x002C, 0x002D, 0x002E, 0x002F),
-    (0x0030, 0x0031, 0x0032, 0x0033, 0x0034, 0x0035, 0x0036, 0x0037, 0x0038, 0x0039, 0x003A, 0x003B, 0x003C, 0x003D, 0x003E, 0x003F),
-
-    (0x0040, 0x0041, 0x0042, 0x0043, 0x0044, 0x0045, 0x0046, 0x0047, 0x0048, 0x0049, 0x004A, 0x004B, 0x004C, 0x004D, 0x004E, 0x004F),
-    (0x0050, 0x0051, 0x0052, 0x0053, 0x0054, 0x0055, 0x0056, 0x0057, 0x0058, 0x0059, 0x005A, 0x005B, 0x005C, 0x005D, 0x005E, 0x005F),
-    (0x0060, 0x0061, 0x0062, 0x0063, 0x0064, 0x0065, 0x0066, 0x0067, 0x0068, 0x0069, 0x006A, 0x006B, 0x006C, 0x006D, 0x006E, 0x006F),
-    (0x0070, 0x0071, 0x0072, 0x0073, 0x0074, 0x0075, 0x0076, 0x0077, 0x0078, 0x0079, 0x007A, 0x007B, 0x007C, 0x007D, 0x007E, 0x2302),
-
-    (0x00C7, 0x00FC, 0x00E9, 0x00E2, 0x00E4, 0x00E0, 0x00E5, 0x00E7, 0x00EA, 0x00EB, 0x00E8, 0x00EF, 0x00EE, 0x00EC, 0x00C4, 0x00C5),
-    (0x00C9, 0x00E6, 0x00C6, 0x00F4, 0x00F6, 0x00F2, 0x00FB, 0x00F9, 0x00FF, 0x00D6, 0x00DC, 0x00A2, 0x00A3, 0x00A5, 0x20A7, 0x0192),
-    (0x00E1, 0x00ED, 0x00F3, 0x00FA, 0x00F1, 0x00D1, 0x00AA, 0x00BA, 0x00BF, 0x2310, 0x00AC, 0x00BD, 0x00BC, 0x00A1, 0x00AB, 0x00BB),
-    (0x2591, 0x2592, 0x2593, 0x2502, 0x2524, 0x2561, 0x2562, 0x2556, 0x2555, 0x2563, 0x2551, 0x2557, 0x255D, 0x255C, 0x255B, 0x2510),
-
-    (0x2514, 0x2534, 0x252C, 0x251C, 0x2500, 0x253C, 0x255E, 0x255F, 0x255A, 0x2554, 0x2569, 0x2566, 0x2560, 0x2550, 0x256C, 0x2567),
-    (0x2568, 0x2564, 0x2565, 0x2559, 0x2558, 0x2552, 0x2553, 0x256B, 0x256A, 0x2518, 0x250C, 0x2588, 0x2584, 0x258C, 0x2590, 0x2580),
-    (0x03B1, 0x00DF, 0x0393, 0x03C0, 0x03A3, 0x03C3, 0x00B5, 0x03C4, 0x03A6, 0x0398, 0x03A9, 0x03B4, 0x221E, 0x03C6, 0x03B5, 0x2229),
-    (0x2261, 0x00B1, 0x2265, 0x2264, 0x2320, 0x2321, 0x00F7, 0x2248, 0x00B0, 0x2219, 0x00B7, 0x221A, 0x207F, 0x00B2, 0x25A0, 0x00A0),
-    ]
-
-cp850_table = cp437_table[0:8] + [
-    (0x00C7, 0x00FC, 0x00E9, 0x00E2, 0x00E4, 0x00E0, 0x00E5, 0x00E7, 0x00EA, 0x00EB, 0x00E8, 0x00EF, 0x00EE, 0x00EC, 0x00C4, 0x00C5),
-    (0x00C9, 0x00E6, 0x00C6, 0x00F4, 0x00F6, 0x00F2, 0x00FB, 0x00F9, 0x00FF, 0x00D6, 0x00DC, 0x00F8, 0x00A3, 0x00D8, 0x00D7, 0x0192),
-    (0x00E1, 0x00ED, 0x00F3, 0x00FA, 0x00F1, 0x00D1, 0x00AA, 0x00BA, 0x00BF, 0x00AE, 0x00AC, 0x00BD, 0x00BC, 0x00A1, 0x00AB, 0x00BB),
-    (0x2591, 0x2592, 0x2593, 0x2502, 0x2524, 0x00C1, 0x00C2, 0x00C0, 0x00A9, 0x2563, 0x2551, 0x2557, 0x255D, 0x00A2, 0x00A5, 0x2510),
-
-    (0x2514, 0x2534, 0x252C, 0x251C, 0x2500, 0x253C, 0x00E3, 0x00C3, 0x255A, 0x2554, 0x2569, 0x2566, 0x2560, 0x2550, 0x256C, 0x00A4),
-    (0x00F0, 0x00D0, 0x00CA, 0x00CB, 0x00C8, 0x0131, 0x00CD, 0x00CE, 0x00CF, 0x2518, 0x250C, 0x2588, 0x2584, 0x00A6, 0x00CC, 0x2580),
-    (0x00D3, 0x00DF, 0x00D4, 0x00D2, 0x00F5, 0x00D5, 0x00B5, 0x00FE, 0x00DE, 0x00DA, 0x00DB, 0x00D9, 0x00FD, 0x00DD, 0x00AF, 0x00B4),
-    (0x00AD, 0x00B1, 0x2017, 0x00BE, 0x00B6, 0x00A7, 0x00F7, 0x00B8, 0x00B0, 0x00A8, 0x00B7, 0x00B9, 0x00B3, 0x00B2, 0x25A0, 0x00A0),
-    ]
+cp437_table = codepages.get_codepage('cp437').tolist()
+cp850_table = codepages.get_codepage('cp850').tolist()
 
 
 TesterText = """
@@ -104,181 +109,414 @@ def get_max_point_size(resolution, dimensions, max_point_size=72):
 
 # colors
 black = (0, 0, 0)
+white = (255, 255, 255)
+
+# Fonts, point sizes and sheets exported into <repo>/bitmaps
+BITMAP_FONTS = ('Deferral-Regular', 'Deferral-Square')
+BITMAP_POINT_SIZES = range(6, 32)
+BITMAP_SHEETS = ('cp437', 'cp850', 'glyphs')
 
 
 @click.command()
 @click.argument('font-name', metavar='FONT', required=False, default='Deferral-Regular')
-@click.option('-o', '--output', metavar='PATH', help='Save path')
+@click.option('-o', '--output', metavar='PATH', help='Save path', type=click.Path(path_type=Path))
 @click.option('-p', '--point-size', metavar='SIZE', help='Font-point to use', default=16, type=int)
-def main(font_name, point_size, output):
+@click.option('-c', '--codepage', 'codepage_names', metavar='NAME', help='Codepage(s) to show or export', multiple=True)
+@click.option('-e', '--export', is_flag=True, help='Save every size of every sheet and exit')
+@click.option('-g', '--grid', metavar='COLUMNSxROWS', help='Fit a grid of characters to the window, e.g. 80x50')
+@click.option('-s', '--source', metavar='PATH', type=click.Path(exists=True, dir_okay=False, path_type=Path), help='Show a Python file as the code text')
+@click.option('-m', '--memory-cap', metavar='MB', default=budget.default_cap // budget.megabyte, type=int, help='Memory cached surfaces may hold together')
+@click.option('--stats', is_flag=True, help='Print memory stats on exit')
+def main(font_name, point_size, output, codepage_names, export, grid, source, memory_cap, stats):
     output = output or this_repo / 'bitmaps'
+    codepage_names = tuple(codepages.get_codepages(codepage_names))
+    font_path = find_font(font_name)
+    budget.default_budget.cap = memory_cap * budget.megabyte
 
-    pygame.init()
-    info = pygame.display.Info()
+    if export:
+        init_headless()
+        export_bitmaps(font_path, output, text_names=[*codepage_names, 'glyphs'], font_name=font_name)
+    else:
+        pygame.init()
+        viewer = FontViewer(font_name, font_path, point_size, output, codepage_names=codepage_names, grid=grid, source_path=source)
+        viewer.run()
 
-    font_path = find_font(font_name)
-    font = load_font(font_path, point_size)
-    font_height = get_font_height(font_path, point_size)
-
-    glyphs = sorted(set(get_font_glyphs(font_path)))
-    symbols, font_dimensions = get_font_dimensions(font, point_size, glyphs)
-
-    texts = {
-        'cp437': layout_text(
-            text=''.join(chr(code) if code != 0 else ' ' for row in cp437_table for code in row),
-            width=16
-        ),
-        'cp850': layout_text(
-            text=''.join(chr(code) if code != 0 else ' ' for row in cp850_table for code in row),
-            width=16
-        ),
-        'glyphs': layout_text(
-            text=''.join(symbol for symbol, code, name in glyphs if 0x0000 < code < MAX_PYGAME_UNICODE),
-            width=32
-        ),
-        'test': layout_text(text=TesterText),
-        'code': layout_text(text=code_text),
-    }
+    if stats:
+        click.echo('\n'.join(budget.default_budget.format_stats()), err=True)
 
-    text_name = 'glyphs'
-    random_color_generator = get_random_color()
-    colors = None
-    # colors = {
-    #     symbol: next(random_color_generator)
-    #     for symbol, code, name in glyphs
-    # }
-
-    dimensions = sum(1 for character in texts[text_name].split('\n')[0]), sum(1 for line in texts[text_name].split('\n'))
-    monitor_resolution = info.current_w, info.current_h
-    font_size, font_width, font_height = font_dimensions
-    screen_flags = (pygame.RESIZABLE | pygame.HWSURFACE | pygame.DOUBLEBUF)
-    screen = pygame.display.set_mode((dimensions[0] * font_width, dimensions[1] * font_height), screen_flags)
-    resolution = screen.get_size()
 
-    text_surface = render_text_surface(texts[text_name], font, font_dimensions, colors=colors, ignore_whitespace=True)
-    screen.blit(text_surface, (0, 0))
-    pygame.display.flip()
+class FontViewer(Viewer):
+    screen_flags = (pygame.RESIZABLE | pygame.HWSURFACE | pygame.DOUBLEBUF)
 
-    # Event loop
-    while True:
-        dimensions = sum(1 for character in texts[text_name].split('\n')[0]), sum(1 for line in texts[text_name].split('\n'))
-        monitor_resolution = info.current_w, info.current_h
-        max_point_size = get_max_point_size(monitor_resolution, dimensions)
-
-        pressed = pygame.key.get_pressed()
-        if pressed[pygame.K_SPACE]:
-            if colors:
-                colors = {
-                    symbol: next(random_color_generator)
-                    for symbol, code, name in glyphs
-                }
-            text_surface = render_text_surface(texts[text_name], font, font_dimensions, colors=colors, ignore_whitespace=True)
-            screen.fill(black)
-
-        for event in pygame.event.get():
-            mods = pygame.key.get_mods()
-            meta_only = (mods & pygame.KMOD_META) and (mods & ~(pygame.KMOD_LMETA | pygame.KMOD_RMETA | pygame.KMOD_META) == 0)
-
-            if event.type == pygame.QUIT or (event.type == pygame.KEYDOWN and event.key in [pygame.K_q, pygame.K_ESCAPE]):
-                return
-
-            elif event.type == pygame.VIDEORESIZE:
-                resolution = event.dict['size']
-                dimensions = sum(1 for character in texts[text_name].split('\n')[0]), sum(1 for line in texts[text_name].split('\n'))
-                max_point_size = get_max_point_size(resolution, dimensions)
-                point_size = min(max_point_size, point_size)
-
-                font = load_font(font_path, point_size)
-                symbols, font_dimensions = get_font_dimensions(font, point_size, glyphs)
-                text_surface = render_text_surface(texts[text_name], font, font_dimensions, colors=colors, ignore_whitespace=True)
-                screen = pygame.display.set_mode(resolution, screen_flags)
-                screen.fill(black)
-                pygame.display.flip()
-
-            if event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_c:
-                    if not colors:
-                        colors = {
-                            symbol: next(random_color_generator)
-                            for symbol, code, name in glyphs
-                        }
-                    else:
-                        colors = None
-                    text_surface = render_text_surface(texts[text_name], font, font_dimensions, colors=colors, ignore_whitespace=True)
-                    screen.fill(black)
-
-                elif event.key == pygame.K_g:
-                    font = load_font(font_path, point_size)
-                    glyphs = sorted(set(get_font_glyphs(font_path)))
-                    symbols, font_dimensions = get_font_dimensions(font, point_size, glyphs)
-
-                    texts = {
-                        'cp437': layout_text(
-                            text=''.join(chr(code) if code != 0 else ' ' for row in cp437_table for code in row),
-                            width=16
-                        ),
-                        'cp850': layout_text(
-                            text=''.join(chr(code) if code != 0 else ' ' for row in cp850_table for code in row),
-                            width=16
-                        ),
-                        'glyphs': layout_text(
-                            text=''.join(symbol for symbol, code, name in glyphs if 0x0000 < code < MAX_PYGAME_UNICODE),
-                            width=32
-                        ),
-                        'test': layout_text(text=TesterText),
-                        'code': layout_text(text=code_text),
-                    }
-
-                    dimensions = sum(1 for character in texts[text_name].split('\n')[0]), sum(1 for line in texts[text_name].split('\n'))
-                    max_point_size = get_max_point_size(screen.get_size(), dimensions)
-                    point_size = min(max_point_size, point_size)
-
-                    text_surface = render_text_surface(texts[text_name], font, font_dimensions, colors=colors, ignore_whitespace=True)
-                    screen.fill(black)
-
-                elif event.key == pygame.K_t:
-                    dimensions = sum(1 for character in texts[text_name].split('\n')[0]), sum(1 for line in texts[text_name].split('\n'))
-                    max_point_size = get_max_point_size(screen.get_size(), dimensions)
-                    point_size = min(max_point_size, point_size)
-
-                    text_names = [k for k in texts]
-                    text_name_index = text_names.index(text_name) + 1
-                    if not 0 <= text_name_index < len(text_names):
-                        text_name_index = 0
-                    text_name = text_names[text_name_index]
-                    text_surface = render_text_surface(texts[text_name], font, font_dimensions, colors=colors, ignore_whitespace=True)
-                    screen.fill(black)
-
-                elif meta_only:
-                    if event.key == pygame.K_e:
-                        if not output.exists():
-                            output.mkdir(parents=True, exist_ok=True)
-                        filepath = output / f'{font_name}-{point_size:>02}-{text_name}.png'
-                        pygame.image.save(text_surface, str(filepath))
-
-                    elif event.key == pygame.K_x:
-                        remove_bitmaps()
-
-                    elif event.key == pygame.K_EQUALS:
-                        point_size = min(point_size + 1, max_point_size)
-                        font = load_font(font_path, point_size)
-                        symbols, font_dimensions = get_font_dimensions(font, point_size, glyphs)
-                        text_surface = render_text_surface(texts[text_name], font, font_dimensions, colors=colors, ignore_whitespace=True)
-                        screen.fill(black)
-
-                    elif event.key == pygame.K_MINUS:
-                        point_size = max(point_size - 1, 1)
-                        font = load_font(font_path, point_size)
-                        symbols, font_dimensions = get_font_dimensions(font, point_size, glyphs)
-                        text_surface = render_text_surface(texts[text_name], font, font_dimensions, colors=colors, ignore_whitespace=True)
-                        screen.fill(black)
-
-        pygame.display.set_caption(f'{point_size}-point {text_name} {font_name} ')
-        # scaled_surface = pygame.transform.scale(text_surface, resolution, screen)
-        # screen.blit(scaled_surface, (0, 0))
-        screen.blit(text_surface, (0, 0))
+    # Sheets are scrolled, so only this many rows need to fit the monitor
+    min_visible_rows = 16
+
+    # Seconds between checks of the source file for changes
+    source_check_interval = 0.5
+    highlight_tab_size = 4
+
+    def __init__(self, font_name, font_path, point_size, output, codepage_names=None, grid=None, source_path=None):
+        self.font_name = font_name
+        self.font_path = font_path
+        self.output = output
+        self.codepage_names = codepage_names
+        self.grid = grid and tuple(int(cells) for cells in grid.lower().split('x'))
+
+        info = pygame.display.Info()
+        self.monitor_resolution = info.current_w, info.current_h
+        self.cell_metrics = autofit.get_cell_metrics(font_path)
+        if self.grid:
+            point_size = self.fit_point_size(self.monitor_resolution)
+        self.point_size = point_size
+
+        self.text_name = 'code' if source_path else 'glyphs'
+        self.source_path = source_path
+        self.source_mtime = None
+        self.next_source_check = 0
+        self.highlighter = highlight.Highlighter()
+        self.highlighting = True
+        self.random_color_generator = get_random_color()
+        self.colors = None
+        self.blend_mode = 'gamma'
+        self.scroll = (0, 0)  # top left cell: column, row
+        self.renders = None
+        self.load_glyphs()
+        self.load_font()
+
+        font_size, font_width, font_height = self.font_dimensions
+        screen_dimensions = self.grid or self.dimensions
+        resolution = screen_dimensions[0] * font_width, screen_dimensions[1] * font_height
+        self.resolution = tuple(min(pixels, limit) for pixels, limit in zip(resolution, self.monitor_resolution))
+        self.screen = budget.default_budget.add('screen', 'screen', pygame.display.set_mode(self.resolution, self.screen_flags))
+        self.sheet = None
+        self.show_stats = False
+        self.stats_font = None
+        self.inspecting = False
+        self.cell_index = None
+        self.glyph_metrics = None
+        self.overlay = inspector.Overlay()
+        self.mouse_position = None
+        self.hovered = None
+        super().__init__()
+
+    def get_bindings(self):
+        meta = pygame.KMOD_META
+        bindings = super().get_bindings()
+        bindings.update({
+            # Colors
+            (pygame.KEYDOWN, pygame.K_c, self.any_modifiers): (self.toggle_colors, [], {}),
+            (pygame.KEYDOWN, pygame.K_b, self.any_modifiers): (self.toggle_blend_mode, [], {}),
+            (pygame.KEYDOWN, pygame.K_h, self.any_modifiers): (self.toggle_highlighting, [], {}),
+
+            # Memory
+            (pygame.KEYDOWN, pygame.K_m, self.any_modifiers): (self.toggle_stats, [], {}),
+
+            # Inspector
+            (pygame.KEYDOWN, pygame.K_i, self.any_modifiers): (self.toggle_inspector, [], {}),
+            (pygame.MOUSEMOTION, None, None): (self.hover, [], {}),
+            (pygame.WINDOWLEAVE, None, None): (self.hover, [], {}),
+
+            # Glyphs
+            (pygame.KEYDOWN, pygame.K_g, self.any_modifiers): (self.reload_glyphs, [], {}),
+
+            # Text
+            (pygame.KEYDOWN, pygame.K_t, self.any_modifiers): (self.cycle_text, [], {}),
+
+            # Bitmaps
+            (pygame.KEYDOWN, pygame.K_e, meta): (self.save_sheet, [], {}),
+            (pygame.KEYDOWN, pygame.K_x, meta): (self.remove_bitmaps, [], {}),
+
+            # Point size
+            (pygame.KEYDOWN, pygame.K_EQUALS, meta): (self.change_point_size, [1], {}),
+            (pygame.KEYDOWN, pygame.K_MINUS, meta): (self.change_point_size, [-1], {}),
+
+            # Scrolling
+            (pygame.KEYDOWN, pygame.K_UP, self.any_modifiers): (self.scroll_by, [0, -1], {}),
+            (pygame.KEYDOWN, pygame.K_DOWN, self.any_modifiers): (self.scroll_by, [0, 1], {}),
+            (pygame.KEYDOWN, pygame.K_LEFT, self.any_modifiers): (self.scroll_by, [-1, 0], {}),
+            (pygame.KEYDOWN, pygame.K_RIGHT, self.any_modifiers): (self.scroll_by, [1, 0], {}),
+            (pygame.KEYDOWN, pygame.K_PAGEUP, self.any_modifiers): (self.scroll_pages, [-1], {}),
+            (pygame.KEYDOWN, pygame.K_PAGEDOWN, self.any_modifiers): (self.scroll_pages, [1], {}),
+            (pygame.KEYDOWN, pygame.K_HOME, self.any_modifiers): (self.scroll_pages, [-sys.maxsize], {}),
+            (pygame.KEYDOWN, pygame.K_END, self.any_modifiers): (self.scroll_pages, [sys.maxsize], {}),
+        })
+        return bindings
+
+    def get_held_bindings(self):
+        return {
+            pygame.K_SPACE: (self.cycle_colors, [], {}),
+        }
+
+    def load_glyphs(self):
+        self.glyphs = cmap.get_cmap_index(self.font_path)
+        self.texts = get_texts(self.glyphs, self.codepage_names)
+        self.load_source()
+        self.update_dimensions()
+
+    def load_source(self):
+        """Reads the source file (or the built-in code text) into the code
+        text and highlights whatever changed"""
+        if self.source_path:
+            self.source_mtime = self.source_path.stat().st_mtime
+            source = self.source_path.read_text(errors='replace')
+            self.texts['code'] = layout_text(source, tab_size=self.highlight_tab_size)
+        else:
+            source = code_text
+        self.highlighter.update(source)
+
+    def load_font(self):
+        self.font = load_font(self.font_path, self.point_size)
+        if self.renders is not None:
+            self.renders.release()
+        self.renders = budget.BudgetedDict('renders')
+        self.symbols, self.font_dimensions = get_font_dimensions(self.font, self.point_size, self.glyphs, self.renders)
+
+    def update_dimensions(self):
+        self.dimensions = get_text_dimensions(self.texts[self.text_name])
+        self.max_point_size = self.fit_point_size(self.monitor_resolution)
+        self.point_size = min(self.max_point_size, self.point_size)
+
+    @property
+    def fit_dimensions(self):
+        """Cells the point size is fitted to: the grid, or else every column
+        and only as many rows as must fit, since sheets scroll"""
+        if self.grid:
+            return self.grid
+        columns, rows = self.dimensions
+        return columns, min(rows, self.min_visible_rows)
+
+    def fit_point_size(self, resolution):
+        return get_max_point_size(resolution, self.fit_dimensions, cell_metrics=self.cell_metrics)
+
+    @property
+    def cell_size(self):
+        # rows overlap by a pixel, as in render_text_surface
+        point_size, font_width, font_height = self.font_dimensions
+        return font_width, font_height - 1
+
+    @property
+    def visible_cells(self):
+        return tuple(max(pixels // max(cell, 1), 1) for pixels, cell in zip(self.screen.get_size(), self.cell_size))
+
+    @property
+    def scroll_offset(self):
+        return tuple(cells * pixels for cells, pixels in zip(self.scroll, self.cell_size))
+
+    def get_sheet(self):
+        if self.text_name == 'code' and self.highlighting and not self.colors:
+            return highlight.CodeSheet(self.highlighter, self.font, self.cell_size, tab_size=self.highlight_tab_size)
+        return tiles.TiledSheet(self.texts[self.text_name], self.cell_size, self.render_tile)
+
+    def render_tile(self, text):
+        return render_text_surface(
+            text, self.font, self.font_dimensions,
+            colors=self.colors, ignore_whitespace=True, renders=self.renders, blend_mode=self.blend_mode,
+        )
+
+    def refresh(self, parts):
+        if 'glyphs' in parts:
+            self.load_glyphs()
+            self.glyph_metrics = None
+        if parts & {'glyphs', 'font'}:
+            self.load_font()
+        if 'window' in parts:
+            self.screen = budget.default_budget.add('screen', 'screen', pygame.display.set_mode(self.resolution, self.screen_flags))
+        rebuild = parts - {'scroll', 'source'} or self.sheet is None
+        if 'source' in parts and self.text_name == 'code' and not isinstance(self.sheet, highlight.CodeSheet):
+            rebuild = True
+        if rebuild:
+            if self.sheet:
+                self.sheet.release()
+            # keep the plain renders, the colors may have changed
+            for key in [key for key in self.renders if key[1] != white]:
+                self.renders.pop(key)
+            self.sheet = self.get_sheet()
+            self.cell_index = None
+        self.scroll = tuple(
+            max(min(cell, total - visible), 0)
+            for cell, total, visible in zip(self.scroll, self.dimensions, self.visible_cells)
+        )
+
+    def draw(self):
+        column, row = self.scroll
+        last_row = min(row + self.visible_cells[1], self.dimensions[1])
+        pygame.display.set_caption(f'{self.point_size}-point {self.text_name} {self.font_name} (rows {row + 1}-{last_row} of {self.dimensions[1]})')
+        self.screen.fill(black)
+        self.sheet.draw(self.screen, self.scroll_offset)
+        if self.show_stats:
+            self.draw_stats()
+        if self.inspecting:
+            self.overlay.capture(self.screen)
+            self.hovered = None
+            self.draw_tooltip(update=False)
         pygame.display.flip()
-        pygame.time.wait(1)
+
+    def get_stats_font(self):
+        self.stats_font = self.stats_font or pygame.font.Font(None, 18)
+        return self.stats_font
+
+    def draw_stats(self):
+        """Overlays the memory held by surfaces in the top left corner"""
+        lines = budget.default_budget.format_stats()
+        surfaces = [self.get_stats_font().render(line, True, (255, 255, 0), black) for line in lines]
+        y = 0
+        for surface in surfaces:
+            self.screen.blit(surface, (0, y))
+            y += surface.get_height()
+
+    def get_cell_index(self):
+        """Glyph of every cell of the current text, built once per layout;
+        highlighted code is drawn on the cell grid, other sheets place
+        their glyphs by advance"""
+        if self.cell_index is None:
+            if isinstance(self.sheet, highlight.CodeSheet):
+                lines = self.highlighter.lines
+                text = '\n'.join(
+                    ''.join(character for character, color in self.highlighter.get_cells(row, self.highlight_tab_size))
+                    for row in range(len(lines))
+                )
+                offsets = None
+            else:
+                text = self.texts[self.text_name]
+                # advances are the same in every color, so the plain renders do
+                offsets = get_line_offsets(layout.wrap_lines(text), self.font, self.point_size, self.renders)
+            self.cell_index = inspector.CellIndex(text, self.glyphs, offsets)
+        return self.cell_index
+
+    def get_glyph_metrics(self):
+        """Bounds of every glyph, for TrueType fonts only"""
+        if self.glyph_metrics is None and self.font_path.suffix.lower() not in bitmap_font.suffixes:
+            self.glyph_metrics = metrics.read_glyph_metrics(get_font(self.font_path))
+        return self.glyph_metrics
+
+    def draw_tooltip(self, update=True):
+        """Shows the glyph under the mouse on the overlay, drawing only when
+        the mouse moved to another cell"""
+        position = None
+        if self.mouse_position:
+            x, y = (pixels + offset for pixels, offset in zip(self.mouse_position, self.scroll_offset))
+            position = self.get_cell_index().lookup(x, y, self.cell_size)
+        if position == self.hovered and (position is None) == (self.overlay.rect is None):
+            return
+        self.hovered = position
+        tooltip = None
+        if position is not None:
+            lines = inspector.describe(self.glyphs, position, self.get_glyph_metrics(), self.point_size)
+            tooltip = inspector.render_tooltip(self.get_stats_font(), lines)
+        changed = self.overlay.show(self.screen, tooltip, self.mouse_position)
+        if update and changed:
+            pygame.display.update(changed)
+
+    def idle(self):
+        self.check_source()
+        if self.inspecting and not self.invalidated:
+            self.draw_tooltip()
+        if self.sheet and not self.invalidated:
+            self.sheet.prefetch(self.scroll_offset, self.screen.get_size())
+
+    def random_colors(self):
+        return {
+            chr(code): next(self.random_color_generator)
+            for code in self.glyphs.codepoints.tolist()
+        }
+
+    def handle_video_resize(self, event):
+        self.resolution = event.dict['size']
+        if self.grid:
+            self.point_size = self.fit_point_size(self.resolution)
+        else:
+            self.point_size = min(self.fit_point_size(self.resolution), self.point_size)
+        self.invalidate('window', 'font')
+
+    def check_source(self):
+        """Reloads the source file when it has changed"""
+        now = time.monotonic()
+        if not self.source_path or now < self.next_source_check:
+            return
+        self.next_source_check = now + self.source_check_interval
+        try:
+            changed = self.source_path.stat().st_mtime != self.source_mtime
+        except FileNotFoundError:  # e.g. while an editor replaces it
+            return
+        if changed:
+            self.load_source()
+            if self.text_name == 'code':
+                self.dimensions = get_text_dimensions(self.texts['code'])
+            self.invalidate('source')
+
+    def toggle_stats(self, event):
+        self.show_stats = not self.show_stats
+        self.invalidate('scroll')
+
+    def toggle_inspector(self, event):
+        self.inspecting = not self.inspecting
+        if not self.inspecting:
+            self.overlay.release()
+        self.invalidate('scroll')
+
+    def hover(self, event):
+        # the tooltip follows in idle, once per frame
+        self.mouse_position = getattr(event, 'pos', None)
+
+    def toggle_highlighting(self, event):
+        self.highlighting = not self.highlighting
+        self.invalidate('text')
+
+    def toggle_colors(self, event):
+        self.colors = None if self.colors else self.random_colors()
+        self.invalidate('text')
+
+    def toggle_blend_mode(self, event):
+        self.blend_mode = 'direct' if self.blend_mode == 'gamma' else 'gamma'
+        if self.colors:
+            self.invalidate('text')
+
+    def cycle_colors(self, event):
+        if self.colors:
+            self.colors = self.random_colors()
+            self.invalidate('text')
+
+    def reload_glyphs(self, event):
+        self.invalidate('glyphs')
+
+    def cycle_text(self, event):
+        text_names = [k for k in self.texts]
+        text_name_index = text_names.index(self.text_name) + 1
+        if not 0 <= text_name_index < len(text_names):
+            text_name_index = 0
+        self.text_name = text_names[text_name_index]
+        self.scroll = (0, 0)
+        self.update_dimensions()
+        self.invalidate('font')
+
+    def change_point_size(self, event, step):
+        self.point_size = max(min(self.point_size + step, self.max_point_size), 1)
+        self.invalidate('font')
+
+    def scroll_by(self, event, columns, rows):
+        self.scroll = self.scroll[0] + columns, self.scroll[1] + rows
+        self.invalidate('scroll')
+
+    def scroll_pages(self, event, pages):
+        visible_rows = self.visible_cells[1]
+        self.scroll = self.scroll[0], max(min(self.scroll[1] + pages * visible_rows, self.dimensions[1]), -self.dimensions[1])
+        self.invalidate('scroll')
+
+    def save_sheet(self, event):
+        self.flush()
+        if not self.output.exists():
+            self.output.mkdir(parents=True, exist_ok=True)
+        filepath = self.output / f'{self.font_name}-{self.point_size:>02}-{self.text_name}.png'
+        text_surface = render_text_surface(
+            self.texts[self.text_name], self.font, self.font_dimensions,
+            colors=self.colors, ignore_whitespace=True, renders=self.renders, blend_mode=self.blend_mode,
+        )
+        budget.default_budget.add('export', filepath.name, text_surface)
+        pygame.image.save(text_surface, str(filepath))
+        budget.default_budget.remove('export', filepath.name)
+
+    def remove_bitmaps(self, event):
+        remove_bitmaps()
 
 
 def find_font(font_name):
@@ -291,7 +529,7 @@ def find_font(font_name):
 
     # Otherwise look for a name
     for font_filename in font_filenames:
-        for fonts_home in [this_repo] + [h for h in get_fonts_homes()]:
+        for fonts_home in [this_repo, this_repo / 'fonts'] + [h for h in get_fonts_homes()]:
             fonts_path = fonts_home / font_filename
             if not fonts_path.exists():
                 continue
@@ -302,12 +540,18 @@ def find_font(font_name):
     return found
 
 
+def find_fonts(font_names, param_hint='FONTS'):
+    """Paths of the fonts named on a command line, or of every font in
+    <repo>/fonts when none are; a font that cannot be found is reported as
+    a bad parameter"""
+    font_paths = [find_font(font_name) for font_name in font_names]
+    if None in font_paths:
+        raise click.BadParameter(f'could not find {font_names[font_paths.index(None)]}', param_hint=param_hint)
+    return font_paths or sorted((this_repo / 'fonts').glob('*.ttf'))
+
+
 def glyph_is_visible(symbol, name, code):
-    symbol_repr = repr(symbol)
-    if symbol_repr.startswith("'\\x"):
-        return False
-    else:
-        return True
+    return layout.is_visible(code)
 
 
 def get_font(font):
@@ -317,20 +561,40 @@ def get_font(font):
 
 
 def get_font_glyphs(font, visible=None):
-    font = get_font(font)
-    glyphs = {
-        name: code
-        for table in font['cmap'].tables
-        for code, name in table.cmap.items()
-    }
-    for name, code in glyphs.items():
-        code = glyphs[name]
+    glyphs = cmap.get_cmap_index(font)
+    for code, name in zip(glyphs.codepoints.tolist(), glyphs.get_glyph_names()):
         symbol = chr(code)
         if visible and not glyph_is_visible(symbol, name, code):
             continue
         yield symbol, code, name
 
 
+def get_text(text_name, glyphs):
+    """Lays out one of the named texts; glyphs is the font's cmap.CmapIndex"""
+    if text_name == 'test':
+        return layout_text(text=TesterText)
+    elif text_name == 'code':
+        return layout_text(text=code_text)
+    codes, width = get_sheet_codes(text_name, glyphs)
+    return layout_text(text=''.join(chr(code) if code != 0 else ' ' for code in codes), width=width)
+
+
+def get_texts(glyphs, codepage_names=None):
+    """Lays out every named text that can be displayed or exported"""
+    codepage_names = codepage_names or codepages.preferred_codepages
+    text_names = [*codepage_names, 'glyphs', 'test', 'code']
+    return {text_name: get_text(text_name, glyphs) for text_name in text_names}
+
+
+def get_sheet_codes(text_name, glyphs):
+    """Codepoints of each cell of a sheet in layout order, and the number
+    of cells per row"""
+    if text_name == 'glyphs':
+        return glyphs.select(0x0001, MAX_PYGAME_UNICODE).tolist(), 32
+    table = codepages.get_codepage(text_name)
+    return table.ravel().tolist(), table.shape[1]
+
+
 def get_font_height(font, point_size=None):
     font = get_font(font)
     head = font['head']
@@ -343,46 +607,39 @@ def get_font_height(font, point_size=None):
 
 
 def get_font_size_data(font, point_size=None):
-    font = get_font(font)
-    head = font['head']
-    units_per_em = head.unitsPerEm
+    """Yields the width of .notdef and then every glyph whose width differs
+    from it, in ems or, given a point size, in pixels (see metrics.py for
+    the full monospace checks)"""
+    glyph_metrics = metrics.read_glyph_metrics(get_font(font))
 
     # Assumes .notdef is available
-    glyph_set = font.getGlyphSet()
-    standard_width = glyph_set['.notdef'].width / units_per_em
+    widths = glyph_metrics.advances / glyph_metrics.units_per_em
     if point_size:
-        standard_width = standard_width * point_size
-    yield '.notdef', standard_width
-    for glyph_name in glyph_set.keys():
-        glyph = glyph_set[glyph_name]
-        glyph_width = (glyph.width * point_size if point_size else glyph.width) / units_per_em
+        widths = widths * point_size
+    standard_width = widths[glyph_metrics.names.index('.notdef')]
+    yield '.notdef', float(standard_width)
+    for glyph_name, glyph_width in zip(glyph_metrics.names, widths.tolist()):
         if glyph_width != standard_width:
             yield (glyph_name, glyph_width)
 
 
-def get_font_dimensions(font_path, point_size, glyphs):
+def get_font_dimensions(font_path, point_size, glyphs, renders=None):
     """Renders every glyph to a surface and then finds max character
-    height and width"""
+    height and width; given renders, the surfaces are kept in it for
+    render_text_surface"""
     font = load_font(font_path, point_size)
-    antialias = True
-    color = (255, 255, 255)  # RGB, white
-    background = black  # RGB, black
     fonts = {}
     max_width = 0
     max_height = 0
-    for symbol, code, name in glyphs:
-        if code > MAX_PYGAME_UNICODE or code == 0x0000:
-            continue
-        elif len(str(symbol)) == 0:
-            continue
-        try:
-            surface = font.render(symbol, antialias, color, background)
-        except pygame.error:
+    for code in glyphs.select(0x0001, MAX_PYGAME_UNICODE + 1).tolist():
+        symbol = chr(code)
+        surface = render_glyph(font, symbol, white, renders)
+        if surface is None:
             continue
         width, height = surface.get_size()
         max_width = max(width, max_width)
         max_height = max(height, max_height)
-        fonts[code] = (symbol, width, height, surface)
+        fonts[code] = (symbol, width, height)
     return fonts, (point_size, width, height)
 
 
@@ -413,13 +670,19 @@ def get_fonts_homes(platform=None):
     return map(Path, mapping[platform] + project)
 
 
-def get_max_point_size(resolution, dimensions, max_point_size=72):
+def get_max_point_size(resolution, dimensions, max_point_size=72, cell_metrics=None):
+    """Largest point size at which dimensions (columns, rows) of cells and
+    a couple of spare lines fit the resolution"""
     line_offset = 2
     dimensions = dimensions[0], dimensions[1] + line_offset
-    for point_size in range(max_point_size, 1, -1):
-        if all(d * point_size < r for d, r in zip(dimensions, resolution)):
-            break
-    return point_size or 14
+    cell_metrics = cell_metrics or autofit.square_cell
+    return autofit.fit_point_size(cell_metrics, tuple(resolution), dimensions, max_point_size=max_point_size)
+
+
+def get_text_dimensions(text):
+    """Columns and rows taken up by laid out text"""
+    lines = text.split('\n')
+    return max(map(len, lines)), len(lines)
 
 
 def get_random_color():
@@ -437,6 +700,49 @@ def get_random_color():
                 pass
 
 
+def init_headless():
+    """Initializes pygame without a visible window so that sheets can be
+    rendered offscreen (e.g. over ssh or in batch jobs)"""
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    pygame.init()
+    if pygame.display.get_surface() is None:
+        pygame.display.set_mode((1, 1))
+
+
+def export_bitmaps(font_path, output, point_sizes=None, text_names=None, font_name=None):
+    """Saves every point size of every sheet into output, flagging codepage
+    cells that the font has no glyph for"""
+    point_sizes = point_sizes or BITMAP_POINT_SIZES
+    text_names = text_names or BITMAP_SHEETS
+    font_name = font_name or font_path.stem
+    glyphs = cmap.get_cmap_index(font_path)
+    if not output.exists():
+        output.mkdir(parents=True, exist_ok=True)
+    report_missing(glyphs, text_names, font_name)
+
+    # every sheet of a point size is drawn from the same renders
+    for point_size in point_sizes:
+        renders = budget.BudgetedDict('renders')
+        for text_name in text_names:
+            surface = render_sheet(font_path, point_size, text_name, glyphs=glyphs, renders=renders)
+            filepath = output / f'{font_name}-{point_size:>02}-{text_name}.png'
+            budget.default_budget.add('export', filepath.name, surface)
+            pygame.image.save(surface, str(filepath))
+            budget.default_budget.remove('export', filepath.name)
+        renders.release()
+
+
+def report_missing(glyphs, text_names, font_name):
+    """Prints the codepage cells of the sheets that the font has no glyph
+    for"""
+    for text_name in text_names:
+        if text_name in codepages.get_codepage_names():
+            positions, missing = codepages.get_missing(codepages.get_codepage(text_name), glyphs.codepoints)
+            if len(missing):
+                missing = ' '.join(f'U+{code:04X}' for code in missing)
+                click.echo(f'{font_name} has no glyph for {len(positions)} {text_name} cells: {missing}', err=True)
+
+
 def remove_bitmaps():
     bitmap_path = Path(__file__).absolute().parent.parent / 'bitmaps'
     for root, folders, files in os.walk(bitmap_path):
@@ -446,97 +752,131 @@ def remove_bitmaps():
                 os.remove(path)
 
 
-def layout_text(text, width=None):
-    wrapped_text = text
-    if '\n' in text and width is None:
-        pass
-    elif width and len(text) > width:
-        table = []
-        row = []
-        for index, character in enumerate(text):
-            if repr(character).lstrip("'").startswith('\\x') or character in ['\t', '\r']:
-                character = ' '
-            if index and index % width == 0:
-                table.append(''.join(row))
-                row = []
-            row.append(character)
-        table.append(''.join(row))
-        wrapped_text = '\n'.join(table)
-    return wrapped_text
+def layout_text(text, width=None, tab_size=None):
+    return layout.wrap_text(text, width=width, tab_size=tab_size)
 
 
 def load_font(font_filepath, point_size):
     # Handle truetype/opentype and bitmap/png fonts
-    if isinstance(font_filepath, pygame.font.Font):
+    if isinstance(font_filepath, (pygame.font.Font, bitmap_font.BitmapFont)):
         return font_filepath
-    supported_filetypes = ('.ttf', 'otf', '.png', '.bmp')
-    if font_filepath.suffix in supported_filetypes:
+    suffix = font_filepath.suffix.lower()
+    if suffix in ('.ttf', '.otf'):
         font = pygame.font.Font(str(font_filepath), point_size)
+    elif suffix in bitmap_font.suffixes:
+        # the exported sheet at point_size when there is one
+        font = bitmap_font.load_bitmap_font(font_filepath, point_size)
     else:
-        raise ValueError('Font, {font_filepath}, must be one of: TTF/OTF/PNG/BMP.')
+        raise ValueError(f'Font, {font_filepath}, must be one of: TTF/OTF/PNG/BMP.')
     return font
 
 
-def render_text_surface(text, font, font_dimensions, antialias=None, colors=None, background=None, ignore_whitespace=None):
+def render_glyph(font, character, color, renders=None, antialias=True, background=black):
+    """Surface of a character, or None when pygame cannot render it; renders
+    keeps them by (character, color, antialiasing, background) for one
+    font"""
+    key = character, tuple(color), bool(antialias), background and tuple(background)
+    if renders is not None and key in renders:
+        return renders[key]
+    try:
+        surface = font.render(character, antialias, color, background)
+    except pygame.error:
+        surface = None
+    if renders is not None:
+        renders[key] = surface
+    return surface
+
+
+def get_line_offsets(lines, font, point_size, renders=None, colors=None, antialias=True, background=black):
+    """x of every character of every line, and of the end of each line, as
+    render_text_surface places them: a glyph advances by the width of its
+    render (a point size when that is empty) and one that pygame cannot
+    render takes up no room"""
+    offsets = []
+    for line in lines:
+        x = 0
+        line_offsets = [x]
+        for character in line:
+            color = colors.get(character, black) if colors else white
+            character_surface = render_glyph(font, character, color, renders, antialias, background)
+            if character_surface is not None:
+                x += character_surface.get_width() or point_size
+            line_offsets.append(x)
+        offsets.append(line_offsets)
+    return offsets
+
+
+def render_text_surface(text, font, font_dimensions, antialias=None, colors=None, background=None, ignore_whitespace=None, tab_size=4, renders=None, blend_mode=None, offsets=None):
+    """Draws text a line per row of cells.  Every distinct (character, color)
+    is rendered once, or taken from renders when it is shared between calls,
+    the destination of every glyph is worked out from the advances of those
+    renders and the whole sheet is drawn with one blits call; a tab is a
+    single blank cell when ignoring whitespace and runs to the next tab stop
+    otherwise.
+
+    With a blend mode (see blend.py) colors are not rendered at all: the
+    sheet is drawn from the white on black renders, whatever the background,
+    and colored with a lookup table in one pass.  Given a list, offsets is
+    extended with the x of every glyph (see get_line_offsets)"""
     antialias = True if antialias is None else antialias
-    color = (255, 255, 255)
     background = black if background is None else background
-
-    rows = len(text.split('\n'))
-    cols = max(len(row) for row in text.split('\n'))
+    renders = {} if renders is None else renders
+    lines = layout.wrap_lines(text, tab_size=None if ignore_whitespace else tab_size)
+    blending = bool(colors and blend_mode)
 
     point_size, font_width, font_height = font_dimensions
+    # rows overlap by a pixel
+    row_height = font_height - 1
 
-    offset = 1
-    font_height = font_height - offset
-
-    # H is used for determining the "average" glyph space
-    space = font.render('H', antialias, color, background)
-    space_width, space_height = space.get_size()
-
-    text_pixel_width = cols * font_width
-    text_pixel_height = rows * font_height
-
-    text_surface = pygame.Surface((text_pixel_width, text_pixel_height))
+    text_surface = pygame.Surface((max(map(len, lines)) * font_width, len(lines) * row_height))
     text_surface = text_surface.convert()
-    text_surface.fill(background)
-
-    max_width, max_height = text_surface.get_size()
-    y = 0
-    for line in text.splitlines():
-        x = 0
-        for character in line:
+    text_surface.fill(black if blending else background)
+
+    # blended sheets are drawn from the white on black renders
+    render_colors, render_background = (None, black) if blending else (colors, background)
+    line_offsets = get_line_offsets(lines, font, point_size, renders, render_colors, antialias, render_background)
+    if offsets is not None:
+        offsets.extend(line_offsets)
+
+    blits = []
+    cells = []  # (x, y, width, height, palette index) of every glyph, when blending
+    palette = {background: 0}
+    for row, (line, xs) in enumerate(zip(lines, line_offsets)):
+        y = row * row_height
+        for character, x in zip(line, xs):
+            color = colors.get(character, black) if colors else white
+            character_surface = render_glyph(font, character, white if blending else color, renders, antialias, render_background)
+            if character_surface is None:
+                # takes up no room
+                continue
+            # blanks are drawn too: they paint over the pixel row that the
+            #  line above overlaps this one by
+            blits.append((character_surface, (x, y)))
+            if blending:
+                cells.append((x, y, *character_surface.get_size(), palette.setdefault(color, len(palette))))
+    text_surface.blits(blits, doreturn=False)
+    if blending:
+        blend.colorize_surface(text_surface, cells, list(palette), background, blend_mode)
+    return text_surface
 
-            if colors:
-                color = colors.get(character, black)
 
-            if character in ['\n']:
-                y += font_height
-                x = 0
-                continue
+def render_sheet(font_path, point_size, text_name, glyphs=None, colors=None, renders=None, offsets=None):
+    """Renders one of the named texts exactly as the viewer would save it;
+    sheets of the same font and point size can share renders"""
+    glyphs = glyphs or cmap.get_cmap_index(font_path)
+    font = load_font(font_path, point_size)
+    symbols, font_dimensions = get_font_dimensions(font, point_size, glyphs, renders)
+    text = get_text(text_name, glyphs)
+    return render_text_surface(text, font, font_dimensions, colors=colors, ignore_whitespace=True, renders=renders, offsets=offsets)
 
-            if character in ['\r', '\t']:
-                character = ' '
-            elif ignore_whitespace and character in ['\t']:
-                character = ' '
-            elif character in ['\t']:
-                for character in range(4):
-                    text_surface.blit(space, (x, y))
-                    x += (space_width or point_size)
-            else:
-                try:
-                    character_surface = font.render(character, antialias, color, background)
-                except pygame.error:
-                    continue
-                except TypeError:
-                    import pdb; pdb.set_trace()
-                    pass
-                cwidth, cheight = character_surface.get_size()
-                text_surface.blit(character_surface, (x, y))
-                x += (cwidth or point_size)
-        y += font_height
 
-    return text_surface
+def get_sheet_offsets(font_path, point_size, text_name, glyphs=None, renders=None):
+    """x of every glyph of one of the named texts, as render_sheet places
+    them, without drawing the sheet"""
+    glyphs = glyphs or cmap.get_cmap_index(font_path)
+    font = load_font(font_path, point_size)
+    lines = layout.wrap_lines(get_text(text_name, glyphs))
+    return get_line_offsets(lines, font, point_size, renders)
 
 
 if __name__ == '__main__':
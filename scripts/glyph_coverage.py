@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Reports which codepage positions and Unicode blocks each font covers.
+
+Usage: glyph_coverage.py [OPTIONS] [FONTS]...
+
+  FONTS are font names or paths [default: every font in <repo>/fonts]
+
+Options:
+  -c, --codepage NAME     Codepage(s) to check, or "all" [default: cp437, cp850]
+  -p, --point-size SIZE   Point size of the missing-glyph sheets [default: 16]
+  -o, --output PATH       Report folder [default: <repo>/coverage]
+  --help                  Show this message and exit.
+
+Notes:
+    - writes coverage.json and, for every font missing codepage glyphs, a
+      <font>-<codepage>-missing.png sheet with the missing cells in red
+"""
+
+import importlib
+import json
+from pathlib import Path
+
+import click
+import numpy as np
+import pygame
+
+import codepages
+
+font_viewer = importlib.import_module('font-viewer')
+
+# (first, last, name) of the Unicode blocks a terminal font is likely to touch
+unicode_blocks = [
+    (0x0000, 0x007F, 'Basic Latin'),
+    (0x0080, 0x00FF, 'Latin-1 Supplement'),
+    (0x0100, 0x017F, 'Latin Extended-A'),
+    (0x0180, 0x024F, 'Latin Extended-B'),
+    (0x0250, 0x02AF, 'IPA Extensions'),
+    (0x02B0, 0x02FF, 'Spacing Modifier Letters'),
+    (0x0300, 0x036F, 'Combining Diacritical Marks'),
+    (0x0370, 0x03FF, 'Greek and Coptic'),
+    (0x0400, 0x04FF, 'Cyrillic'),
+    (0x0500, 0x052F, 'Cyrillic Supplement'),
+    (0x0530, 0x058F, 'Armenian'),
+    (0x0590, 0x05FF, 'Hebrew'),
+    (0x0600, 0x06FF, 'Arabic'),
+    (0x0E00, 0x0E7F, 'Thai'),
+    (0x10A0, 0x10FF, 'Georgian'),
+    (0x1D00, 0x1D7F, 'Phonetic Extensions'),
+    (0x1E00, 0x1EFF, 'Latin Extended Additional'),
+    (0x1F00, 0x1FFF, 'Greek Extended'),
+    (0x2000, 0x206F, 'General Punctuation'),
+    (0x2070, 0x209F, 'Superscripts and Subscripts'),
+    (0x20A0, 0x20CF, 'Currency Symbols'),
+    (0x20D0, 0x20FF, 'Combining Diacritical Marks for Symbols'),
+    (0x2100, 0x214F, 'Letterlike Symbols'),
+    (0x2150, 0x218F, 'Number Forms'),
+    (0x2190, 0x21FF, 'Arrows'),
+    (0x2200, 0x22FF, 'Mathematical Operators'),
+    (0x2300, 0x23FF, 'Miscellaneous Technical'),
+    (0x2400, 0x243F, 'Control Pictures'),
+    (0x2440, 0x245F, 'Optical Character Recognition'),
+    (0x2460, 0x24FF, 'Enclosed Alphanumerics'),
+    (0x2500, 0x257F, 'Box Drawing'),
+    (0x2580, 0x259F, 'Block Elements'),
+    (0x25A0, 0x25FF, 'Geometric Shapes'),
+    (0x2600, 0x26FF, 'Miscellaneous Symbols'),
+    (0x2700, 0x27BF, 'Dingbats'),
+    (0x27C0, 0x27EF, 'Miscellaneous Mathematical Symbols-A'),
+    (0x27F0, 0x27FF, 'Supplemental Arrows-A'),
+    (0x2800, 0x28FF, 'Braille Patterns'),
+    (0x2900, 0x297F, 'Supplemental Arrows-B'),
+    (0x2980, 0x29FF, 'Miscellaneous Mathematical Symbols-B'),
+    (0x2A00, 0x2AFF, 'Supplemental Mathematical Operators'),
+    (0x2B00, 0x2BFF, 'Miscellaneous Symbols and Arrows'),
+    (0x2E00, 0x2E7F, 'Supplemental Punctuation'),
+    (0x3000, 0x303F, 'CJK Symbols and Punctuation'),
+    (0xE000, 0xF8FF, 'Private Use Area'),
+    (0xFB00, 0xFB4F, 'Alphabetic Presentation Forms'),
+    (0xFE70, 0xFEFF, 'Arabic Presentation Forms-B'),
+    (0xFF00, 0xFFEF, 'Halfwidth and Fullwidth Forms'),
+    (0xFFF0, 0xFFFF, 'Specials'),
+]
+block_starts = np.array([first for first, last, name in unicode_blocks], dtype=np.uint32)
+block_ends = np.array([last for first, last, name in unicode_blocks], dtype=np.uint32)
+
+# missing cell tint
+missing = (192, 0, 0)
+
+
+def get_codepoints(font):
+    """Every codepoint mapped by the Unicode cmap subtables, as a sorted
+    array"""
+    return font_viewer.cmap.get_cmap_index(font).codepoints
+
+
+def count_blocks(codepoints):
+    """Number of codepoints in each of the unicode_blocks"""
+    block_index = np.searchsorted(block_ends, codepoints)
+    in_block = block_index < len(unicode_blocks)
+    in_block[in_block] = codepoints[in_block] >= block_starts[block_index[in_block]]
+    return np.bincount(block_index[in_block], minlength=len(unicode_blocks))
+
+
+def format_codes(codes):
+    return [f'U+{code:04X}' for code in codes]
+
+
+def build_report(font_codepoints, codepage_tables):
+    """Compares fonts with each other, with codepages and with the unicode
+    blocks"""
+    union = np.unique(np.concatenate(list(font_codepoints.values())))
+    common = union
+    for codepoints in font_codepoints.values():
+        common = np.intersect1d(common, codepoints, assume_unique=True)
+
+    block_sizes = block_ends - block_starts + 1
+    report = {
+        'fonts': {},
+        'common': len(common),
+        'union': len(union),
+    }
+    for font_name, codepoints in font_codepoints.items():
+        others = [other for name, other in font_codepoints.items() if name != font_name]
+        others = np.unique(np.concatenate(others)) if others else np.empty(0, dtype=np.uint32)
+        blocks = count_blocks(codepoints)
+        font_report = report['fonts'][font_name] = {
+            'glyphs': len(codepoints),
+            'only_in_this_font': format_codes(np.setdiff1d(codepoints, others, assume_unique=True)),
+            'missing_from_this_font': format_codes(np.setdiff1d(union, codepoints, assume_unique=True)),
+            'codepages': {},
+            'blocks': {
+                name: {'covered': int(count), 'size': int(size)}
+                for (first, last, name), count, size in zip(unicode_blocks, blocks, block_sizes)
+                if count
+            },
+            'outside_blocks': int(len(codepoints) - blocks.sum()),
+        }
+        for codepage_name, table in codepage_tables.items():
+            needed = codepages.get_codepage_codepoints(table)
+            positions, codes = codepages.get_missing(table, codepoints)
+            font_report['codepages'][codepage_name] = {
+                'covered': int(len(needed) - len(np.unique(codes))),
+                'size': len(needed),
+                'missing': {f'0x{position:02X}': f'U+{code:04X}' for position, code in zip(positions, codes)},
+            }
+    return report
+
+
+def render_missing_sheet(font_path, point_size, codepage_name, positions):
+    """Renders a codepage sheet with the missing cells tinted"""
+    glyphs = font_viewer.cmap.get_cmap_index(font_path)
+    surface = font_viewer.render_sheet(font_path, point_size, codepage_name, glyphs=glyphs)
+    codes, columns = font_viewer.get_sheet_codes(codepage_name, glyphs)
+    rows = -(-len(codes) // columns)
+    cell_width, cell_height = surface.get_width() // columns, surface.get_height() // rows
+    for position in positions:
+        row, column = divmod(int(position), columns)
+        rect = (column * cell_width, row * cell_height, cell_width, cell_height)
+        surface.fill(missing, rect, special_flags=pygame.BLEND_RGB_MAX)
+    return surface
+
+
+@click.command()
+@click.argument('fonts', nargs=-1)
+@click.option('-c', '--codepage', 'codepage_names', metavar='NAME', multiple=True, help='Codepage(s) to check, or "all"')
+@click.option('-p', '--point-size', metavar='SIZE', default=16, type=int, help='Point size of the missing-glyph sheets')
+@click.option('-o', '--output', metavar='PATH', type=click.Path(path_type=Path), help='Report folder')
+def main(fonts, codepage_names, point_size, output):
+    font_paths = font_viewer.find_fonts(fonts)
+    codepage_tables = codepages.get_codepages(codepage_names)
+    output = output or font_viewer.this_repo / 'coverage'
+    output.mkdir(parents=True, exist_ok=True)
+
+    font_codepoints = {font_path.stem: get_codepoints(font_path) for font_path in font_paths}
+    report = build_report(font_codepoints, codepage_tables)
+    with (output / 'coverage.json').open('w') as stream:
+        json.dump(report, stream, indent=2)
+
+    font_viewer.init_headless()
+    click.echo(f'{len(font_paths)} fonts: {report["common"]} codepoints in common, {report["union"]} in total')
+    for font_path in font_paths:
+        font_report = report['fonts'][font_path.stem]
+        click.echo(f'{font_path.stem}: {font_report["glyphs"]} glyphs')
+        for codepage_name, table in codepage_tables.items():
+            codepage_report = font_report['codepages'][codepage_name]
+            click.echo(f'    {codepage_name}: {codepage_report["covered"]}/{codepage_report["size"]}')
+            if codepage_report['missing']:
+                positions, codes = codepages.get_missing(table, font_codepoints[font_path.stem])
+                surface = render_missing_sheet(font_path, point_size, codepage_name, positions)
+                pygame.image.save(surface, str(output / f'{font_path.stem}-{codepage_name}-missing.png'))
+        for block_name, block_report in font_report['blocks'].items():
+            click.echo(f'    {block_name}: {block_report["covered"]}/{block_report["size"]}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Stores exported sheets as one packed file of unique glyph bitmaps.
+
+Usage: glyph_store.py pack [OPTIONS] [FONTS]...
+       glyph_store.py unpack [OPTIONS] [STORE]
+
+  pack renders every character of every sheet once per point size and
+  stores each distinct bitmap once, keyed by its hash; sheets are kept as
+  grids of bitmap indices.  unpack rebuilds the sheets as the same PNGs
+  that font-viewer.py --export writes.
+
+pack options:
+  -p, --point-size SIZE  Point size(s) to store [default: 6-31]
+  -c, --codepage NAME    Codepage sheet(s) to store, or "all"
+                         [default: cp437, cp850]
+  -o, --output PATH      Store to write [default: <repo>/bitmaps/glyphs.npz]
+
+unpack options:
+  -s, --sheet NAME       Only rebuild sheets whose name contains NAME
+  -o, --output PATH      Folder to write PNGs to [default: <repo>/bitmaps]
+
+Notes:
+    - glyphs are rendered white on black, so bitmaps are kept as a single
+      gray channel
+"""
+
+import hashlib
+import importlib
+import json
+import os
+import time
+from pathlib import Path
+
+import click
+import numpy as np
+
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+font_viewer = importlib.import_module('font-viewer')
+pygame = font_viewer.pygame
+
+white = (255, 255, 255)
+
+# bitmap index of a character that pygame could not render; like
+#  render_text_surface, it takes up no room
+skipped = -1
+
+
+class GlyphStore(object):
+    """Unique glyph bitmaps, addressed by the hash of their pixels, and
+    the sheets that are laid out from them"""
+
+    def __init__(self):
+        self.digests = {}
+        self.bitmaps = []
+        self.sheets = {}
+
+    def add_bitmap(self, pixels):
+        """Index of a (rows, columns) gray bitmap, adding it if it is new"""
+        digest = hashlib.sha1(np.array(pixels.shape, dtype=np.uint32).tobytes() + pixels.tobytes()).digest()
+        if digest not in self.digests:
+            self.digests[digest] = len(self.bitmaps)
+            self.bitmaps.append(pixels)
+        return self.digests[digest]
+
+    def add_sheet(self, name, cells, size, row_height, point_size):
+        """A sheet as a grid of bitmap indices (one row per text line, padded
+        with skipped), its pixel size and the distance between rows"""
+        self.sheets[name] = {'cells': cells, 'size': size, 'row_height': row_height, 'point_size': point_size}
+
+    def render_sheet(self, name):
+        """Surface of a sheet, drawn the way render_text_surface draws it"""
+        sheet = self.sheets[name]
+        surface = pygame.Surface(sheet['size'])
+        surface.fill(font_viewer.black)
+        pixels = pygame.surfarray.pixels3d(surface)
+        width, height = sheet['size']
+        for row, indices in enumerate(sheet['cells']):
+            y = row * sheet['row_height']
+            x = 0
+            for index in indices:
+                if index == skipped:
+                    continue
+                bitmap = self.bitmaps[index]
+                bitmap_height, bitmap_width = bitmap.shape
+                visible = bitmap[:max(height - y, 0), :max(width - x, 0)]
+                pixels[x:x + visible.shape[1], y:y + visible.shape[0]] = visible.T[..., None]
+                x += bitmap_width or sheet['point_size']
+        del pixels
+        return surface
+
+    def save(self, path):
+        offsets = np.cumsum([0] + [bitmap.size for bitmap in self.bitmaps])
+        arrays = {
+            'pixels': np.concatenate([bitmap.ravel() for bitmap in self.bitmaps] or [np.zeros(0, np.uint8)]),
+            'bitmaps': np.array(
+                [(offset, *bitmap.shape) for offset, bitmap in zip(offsets, self.bitmaps)], dtype=np.int64
+            ).reshape(-1, 3),
+            'sheets': np.array(json.dumps({
+                name: {key: value for key, value in sheet.items() if key != 'cells'}
+                for name, sheet in self.sheets.items()
+            })),
+        }
+        for name, sheet in self.sheets.items():
+            arrays[f'cells/{name}'] = sheet['cells']
+        np.savez_compressed(path, **arrays)
+
+    @classmethod
+    def load(cls, path):
+        store = cls()
+        with np.load(path) as arrays:
+            pixels = arrays['pixels']
+            for offset, rows, columns in arrays['bitmaps']:
+                store.add_bitmap(pixels[offset:offset + rows * columns].reshape(rows, columns))
+            for name, sheet in json.loads(str(arrays['sheets'])).items():
+                store.add_sheet(name, arrays[f'cells/{name}'], tuple(sheet['size']), sheet['row_height'], sheet['point_size'])
+        return store
+
+
+def get_cell_size(font, glyphs):
+    """The cell size get_font_dimensions reports (that of the last glyph it
+    can render), without rendering every glyph"""
+    for code in reversed(glyphs.select(0x0001, font_viewer.MAX_PYGAME_UNICODE + 1).tolist()):
+        try:
+            return font.render(chr(code), True, white, font_viewer.black).get_size()
+        except pygame.error:
+            continue
+    raise ValueError('font has no glyphs that can be rendered')
+
+
+def render_bitmap(font, character):
+    """Gray pixels (rows, columns) of a character, or None when pygame
+    cannot render it"""
+    try:
+        surface = font.render(character, True, white, font_viewer.black)
+    except pygame.error:
+        return None
+    return np.ascontiguousarray(pygame.surfarray.array_red(surface).T)
+
+
+def pack_font(store, font_path, point_sizes, text_names, font_name=None):
+    """Adds every sheet of a font to store; returns the number of
+    characters laid out and the number actually rendered"""
+    font_name = font_name or font_path.stem
+    glyphs = font_viewer.cmap.get_cmap_index(font_path)
+    texts = {text_name: font_viewer.get_text(text_name, glyphs) for text_name in text_names}
+    characters = renders = 0
+    for point_size in point_sizes:
+        font = font_viewer.load_font(font_path, point_size)
+        cell_width, cell_height = get_cell_size(font, glyphs)
+        row_height = cell_height - 1  # rows overlap by a pixel, as in render_text_surface
+
+        # characters shared by several sheets (e.g. cp437 and cp850) are
+        #  rendered once per size
+        indices = {}
+        for text_name, text in texts.items():
+            lines = text.splitlines()
+            cells = np.full((len(lines), max(map(len, lines), default=0)), skipped, dtype=np.int32)
+            for row, line in enumerate(lines):
+                for column, character in enumerate(line):
+                    character = ' ' if character in '\r\t' else character
+                    if character not in indices:
+                        bitmap = render_bitmap(font, character)
+                        indices[character] = skipped if bitmap is None else store.add_bitmap(bitmap)
+                        renders += 1
+                    cells[row, column] = indices[character]
+                characters += len(line)
+            columns, rows = font_viewer.get_text_dimensions(text)
+            size = columns * cell_width, rows * row_height
+            store.add_sheet(f'{font_name}-{point_size:>02}-{text_name}', cells, size, row_height, point_size)
+    return characters, renders
+
+
+def folder_size(folder, pattern='*.png'):
+    return sum(path.stat().st_size for path in folder.glob(pattern))
+
+
+@click.group()
+def main():
+    pass
+
+
+@main.command()
+@click.argument('fonts', nargs=-1)
+@click.option('-p', '--point-size', 'point_sizes', metavar='SIZE', multiple=True, type=int, help='Point size(s) to store')
+@click.option('-c', '--codepage', 'codepage_names', metavar='NAME', multiple=True, help='Codepage sheet(s) to store, or "all"')
+@click.option('-o', '--output', metavar='PATH', type=click.Path(path_type=Path), help='Store to write')
+def pack(fonts, point_sizes, codepage_names, output):
+    font_paths = font_viewer.find_fonts(fonts)
+    point_sizes = point_sizes or font_viewer.BITMAP_POINT_SIZES
+    text_names = [*font_viewer.codepages.get_codepages(codepage_names), 'glyphs']
+    output = output or font_viewer.this_repo / 'bitmaps' / 'glyphs.npz'
+    output.parent.mkdir(parents=True, exist_ok=True)
+
+    font_viewer.init_headless()
+    start = time.perf_counter()
+    store = GlyphStore()
+    characters = renders = 0
+    for font_path in font_paths:
+        font_characters, font_renders = pack_font(store, font_path, point_sizes, text_names)
+        characters += font_characters
+        renders += font_renders
+    store.save(output)
+    click.echo(
+        f'{output}: {len(store.sheets)} sheets, {characters} cells, {renders} rendered, '
+        f'{len(store.bitmaps)} unique bitmaps, {output.stat().st_size} bytes '
+        f'in {time.perf_counter() - start:.2f}s'
+    )
+    pngs = folder_size(output.parent)
+    if pngs:
+        click.echo(f'{output.parent}: {pngs} bytes of PNGs')
+
+
+@main.command()
+@click.argument('store_path', metavar='STORE', required=False, type=click.Path(exists=True, path_type=Path))
+@click.option('-s', '--sheet', 'sheet_names', metavar='NAME', multiple=True, help='Only rebuild sheets whose name contains NAME')
+@click.option('-o', '--output', metavar='PATH', type=click.Path(path_type=Path), help='Folder to write PNGs to')
+def unpack(store_path, sheet_names, output):
+    store_path = store_path or font_viewer.this_repo / 'bitmaps' / 'glyphs.npz'
+    output = output or store_path.parent
+    output.mkdir(parents=True, exist_ok=True)
+
+    font_viewer.init_headless()
+    store = GlyphStore.load(store_path)
+    names = [name for name in store.sheets if not sheet_names or any(part in name for part in sheet_names)]
+    for name in names:
+        pygame.image.save(store.render_sheet(name), str(output / f'{name}.png'))
+    click.echo(f'wrote {len(names)} sheets to {output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Checks that the renderer still draws the committed bitmaps.
+
+Usage: golden.py [OPTIONS] [GOLDEN]
+
+  Renders every (font, point size, sheet) headlessly and compares it with
+  the sheet of the same name in GOLDEN [default: <repo>/bitmaps].
+
+Options:
+  -f, --font-name NAME   Font(s) to check [default: Deferral-Regular, Deferral-Square]
+  -s, --sheet NAME       Sheet(s) to check [default: cp437, cp850, glyphs]
+  -p, --point-size SIZE  Point size(s) to check [default: 6-31]
+  -j, --jobs COUNT       Worker processes [default: one per core]
+  -t, --tolerance LEVEL  Largest per-channel difference ignored [default: 0]
+  -r, --repeat COUNT     Render every case COUNT times, from cold renders
+                         after the first, which must all be identical
+                         [default: 1]
+  -o, --output PATH      Folder for the sheets of failing cases
+                         [default: <repo>/bitmaps-diff/golden]
+  -u, --update           Write changed and missing sheets into GOLDEN
+  -q, --quiet            Only print failures and the summary
+  --help                 Show this message and exit.
+
+Notes:
+    - sheets are compared by a hash of their pixels; only a sheet whose
+      hash differs is decoded into an array and diffed pixel by pixel, and
+      the glyph cells that changed, cut where the renderer placed each
+      glyph, are listed as bitmap_diff lists them
+    - jobs are the sheets of one font at one point size, handed to a pool
+      of workers as render_farm.py hands them out, so a job's sheets share
+      their glyph renders just like an export
+    - the sheets of failing cases are written to the output folder, so
+      bitmap_diff.py <repo>/bitmaps <output> draws their heatmaps
+    - exits with 1 when any case fails, so it can guard renderer changes
+"""
+
+import hashlib
+import importlib
+import multiprocessing
+import os
+import sys
+import time
+from collections import Counter, namedtuple
+from pathlib import Path
+
+import click
+import numpy as np
+
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+font_viewer = importlib.import_module('font-viewer')
+pygame = font_viewer.pygame
+
+# both import font-viewer too, once the prompt is hidden
+import bitmap_diff
+import render_farm
+
+# options every worker needs for every case
+Check = namedtuple('Check', 'golden, output, tolerance, repeat, update')
+
+CaseResult = namedtuple('CaseResult', 'font_name, point_size, text_name, status, detail, render_seconds, compare_seconds')
+
+failures = ('changed', 'resized', 'missing', 'nondeterministic', 'error')
+
+# changed glyphs listed per case
+max_listed_codes = 8
+
+
+def hash_pixels(size, pixels):
+    return hashlib.blake2b(pixels, digest_size=16, salt=b'%dx%d' % size).digest()
+
+
+def get_pixels(surface):
+    """Size, RGB bytes and their hash of a surface"""
+    size = surface.get_size()
+    pixels = pygame.image.tobytes(surface, 'RGB')
+    return size, pixels, hash_pixels(size, pixels)
+
+
+def to_array(size, pixels):
+    return np.frombuffer(pixels, dtype=np.uint8).reshape(size[1], size[0], 3)
+
+
+def diff_sheets(golden, rendered, text_name, glyphs, tolerance, offsets=None):
+    """Status and detail of two sheets of the same size whose hashes differ;
+    both are sliced into glyph cells at the offsets the renderer placed
+    the rendered sheet's glyphs at"""
+    golden_array, rendered_array = to_array(*golden), to_array(*rendered)
+    delta = np.abs(golden_array.astype(np.int16) - rendered_array.astype(np.int16)).max(axis=-1)
+    changed_pixels = int((delta > tolerance).sum())
+    if not changed_pixels:
+        return 'ok', f'within tolerance (largest difference {delta.max()})'
+    codes, fractions = bitmap_diff.diff_cells(
+        bitmap_diff.slice_cells(golden_array, text_name, glyphs, offsets),
+        bitmap_diff.slice_cells(rendered_array, text_name, glyphs, offsets),
+        tolerance=tolerance,
+    )
+    changed = codes[fractions > 0]
+    listed = ' '.join(f'U+{code:04X}' for code in changed[:max_listed_codes])
+    more = f' and {len(changed) - max_listed_codes} more' if len(changed) > max_listed_codes else ''
+    return 'changed', f'{changed_pixels} pixels in {len(changed)} glyph cells: {listed}{more}'
+
+
+def check_repeats(job, text_name, glyphs, digest, repeat):
+    """Renders a case again without shared renders; a status and detail
+    when a render differs from the first, else None"""
+    for count in range(2, repeat + 1):
+        surface = font_viewer.render_sheet(job.font_path, job.point_size, text_name, glyphs=glyphs)
+        if get_pixels(surface)[2] != digest:
+            return 'nondeterministic', f'render {count} differs from the first'
+    return None
+
+
+def compare_golden(golden_path, rendered, text_name, glyphs, tolerance, offsets=None):
+    """Status and detail of a rendered (size, pixels, hash) against its
+    golden sheet"""
+    if not golden_path.exists():
+        return 'missing', f'no {golden_path}'
+    golden = get_pixels(pygame.image.load(str(golden_path)))
+    if golden[2] == rendered[2]:
+        return 'ok', ''
+    if golden[0] != rendered[0]:
+        return 'resized', f'{golden[0][0]}x{golden[0][1]} is now {rendered[0][0]}x{rendered[0][1]}'
+    return diff_sheets(golden[:2], rendered[:2], text_name, glyphs, tolerance, offsets)
+
+
+def check_sheet(job, text_name, glyphs, renders, check):
+    """Renders one case and compares it with its golden sheet"""
+    name = f'{job.font_name}-{job.point_size:>02}-{text_name}.png'
+    start = time.perf_counter()
+    offsets = []
+    surface = font_viewer.render_sheet(job.font_path, job.point_size, text_name, glyphs=glyphs, renders=renders, offsets=offsets)
+    rendered = get_pixels(surface)
+    repeated = check_repeats(job, text_name, glyphs, rendered[2], check.repeat)
+    render_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    golden_path = check.golden / name
+    status, detail = repeated or compare_golden(golden_path, rendered, text_name, glyphs, check.tolerance, offsets)
+    output_path = check.output / name
+    if status in ('changed', 'resized', 'missing') and check.update:
+        pygame.image.save(surface, str(golden_path))
+        status = 'updated'
+    if status in failures:
+        pygame.image.save(surface, str(output_path))
+    else:
+        # left over from an earlier run
+        output_path.unlink(missing_ok=True)
+    compare_seconds = time.perf_counter() - start
+    return CaseResult(job.font_name, job.point_size, text_name, status, detail, render_seconds, compare_seconds)
+
+
+def check_job(task):
+    """Checks every sheet of a job, sharing renders as an export does"""
+    job, check = task
+    glyphs = font_viewer.cmap.get_cmap_index(job.font_path)
+    renders = {}
+    results = []
+    for text_name in job.text_names:
+        try:
+            results.append(check_sheet(job, text_name, glyphs, renders, check))
+        except Exception as error:
+            results.append(CaseResult(job.font_name, job.point_size, text_name, 'error', repr(error), 0, 0))
+    return results
+
+
+def run_checks(jobs, check, workers, progress=None):
+    """Checks jobs with a pool of workers; progress(done, total, result) is
+    called as each case finishes.  Returns the results in that order"""
+    check.output.mkdir(parents=True, exist_ok=True)
+    total = sum(len(job.text_names) for job in jobs)
+    results = []
+    with multiprocessing.Pool(workers, initializer=render_farm.init_worker) as pool:
+        for job_results in pool.imap_unordered(check_job, [(job, check) for job in jobs]):
+            for result in job_results:
+                results.append(result)
+                if progress:
+                    progress(len(results), total, result)
+    return results
+
+
+def format_result(result):
+    return (
+        f'{result.font_name} {result.point_size}pt {result.text_name}: {result.status} '
+        f'(render {result.render_seconds * 1000:.0f}ms, compare {result.compare_seconds * 1000:.0f}ms)'
+        f'{" " + result.detail if result.detail else ""}'
+    )
+
+
+def echo_progress(done, total, result):
+    click.echo(f'[{done:>{len(str(total))}}/{total}] {format_result(result)}', err=True)
+
+
+def echo_failures(done, total, result):
+    if result.status in failures:
+        echo_progress(done, total, result)
+
+
+def summarize(results, seconds, workers):
+    statuses = Counter(result.status for result in results)
+    rendering = sum(result.render_seconds for result in results)
+    slowest = max(results, key=lambda result: result.render_seconds)
+    return (
+        f'{len(results)} cases in {seconds:.2f}s with {workers} workers: '
+        f'{", ".join(f"{count} {status}" for status, count in sorted(statuses.items()))} '
+        f'(rendering {rendering:.2f}s, slowest {slowest.font_name} {slowest.point_size}pt {slowest.text_name} '
+        f'{slowest.render_seconds * 1000:.0f}ms)'
+    )
+
+
+@click.command()
+@click.argument('golden', required=False, type=click.Path(exists=True, file_okay=False, path_type=Path))
+@click.option('-f', '--font-name', 'font_names', metavar='NAME', multiple=True, help='Font(s) to check')
+@click.option('-s', '--sheet', 'sheets', metavar='NAME', multiple=True, help='Sheet(s) to check')
+@click.option('-p', '--point-size', 'point_sizes', metavar='SIZE', multiple=True, type=int, help='Point size(s) to check')
+@click.option('-j', '--jobs', 'workers', metavar='COUNT', default=os.cpu_count() or 1, type=click.IntRange(min=1), help='Worker processes')
+@click.option('-t', '--tolerance', metavar='LEVEL', default=0, type=int, help='Largest per-channel difference ignored')
+@click.option('-r', '--repeat', metavar='COUNT', default=1, type=click.IntRange(min=1), help='Render every case COUNT times')
+@click.option('-o', '--output', metavar='PATH', type=click.Path(path_type=Path), help='Folder for the sheets of failing cases')
+@click.option('-u', '--update', is_flag=True, help='Write changed and missing sheets into GOLDEN')
+@click.option('-q', '--quiet', is_flag=True, help='Only print failures and the summary')
+def main(golden, font_names, sheets, point_sizes, workers, tolerance, repeat, output, update, quiet):
+    golden = golden or font_viewer.this_repo / 'bitmaps'
+    font_names = font_names or font_viewer.BITMAP_FONTS
+    sheets = sheets or font_viewer.BITMAP_SHEETS
+    point_sizes = point_sizes or font_viewer.BITMAP_POINT_SIZES
+    output = output or font_viewer.this_repo / 'bitmaps-diff' / 'golden'
+    font_paths = font_viewer.find_fonts(font_names, param_hint='--font-name')
+
+    jobs = render_farm.get_jobs(font_paths, point_sizes, sheets)
+    check = Check(golden, output, tolerance, repeat, update)
+    start = time.perf_counter()
+    results = run_checks(jobs, check, workers, progress=echo_failures if quiet else echo_progress)
+    click.echo(f'{golden}: {summarize(results, time.perf_counter() - start, workers)}')
+    failed = sum(result.status in failures for result in results)
+    if failed:
+        click.echo(f'{failed} of {len(results)} cases failed; their sheets are in {output}', err=True)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
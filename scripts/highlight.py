@@ -0,0 +1,257 @@
+"""
+Syntax highlighting for the code preview.
+
+Source is tokenized with tokenize one logical line at a time, so after an
+edit only the logical lines from the first changed one up to where the old
+and new lines line up again are tokenized again.  Lines are drawn from a
+cache of glyphs keyed by (character, color) and their surfaces are kept
+until their text or colors change.
+"""
+
+import builtins
+import functools
+import keyword
+import token
+import tokenize
+from collections import OrderedDict
+
+import pygame
+
+import budget
+import colors
+import layout
+
+default_color = tuple(colors.WHITE)
+background = tuple(colors.BLACK)
+
+token_colors = {
+    'keyword': tuple(colors.ORANGE),
+    'builtin': tuple(colors.MEDIUMPURPLE1),
+    'definition': tuple(colors.GOLD1),
+    'name': default_color,
+    'string': tuple(colors.PALEGREEN3),
+    'number': tuple(colors.SKYBLUE1),
+    'comment': tuple(colors.GRAY50),
+    'operator': tuple(colors.LIGHTSALMON1),
+    'error': tuple(colors.RED1),
+}
+
+builtin_names = frozenset(dir(builtins))
+
+
+def get_token_color(token_info, previous=None):
+    """Color of a token; previous is the name token before it, if any"""
+    kind = token_info.type
+    if kind == token.NAME:
+        if keyword.iskeyword(token_info.string) or keyword.issoftkeyword(token_info.string):
+            return token_colors['keyword']
+        if previous in ('def', 'class'):
+            return token_colors['definition']
+        if token_info.string in builtin_names:
+            return token_colors['builtin']
+        return token_colors['name']
+    elif kind == token.STRING or kind in getattr(token, 'FSTRING_TOKENS', ()):
+        return token_colors['string']
+    elif kind == token.NUMBER:
+        return token_colors['number']
+    elif kind == token.COMMENT:
+        return token_colors['comment']
+    elif kind == token.OP:
+        return token_colors['operator']
+    elif kind == token.ERRORTOKEN and not token_info.string.isspace():
+        return token_colors['error']
+    return None
+
+
+def tokenize_logical_line(lines, start):
+    """Colors of every character of the logical line starting at lines[start],
+    one list per physical line, and the index of the line after it"""
+    readline = functools.partial(next, (lines[row] + '\n' for row in range(start, len(lines))), '')
+    line_colors = []
+    depth = 0
+    previous = None
+    end = len(lines)
+    try:
+        for token_info in tokenize.generate_tokens(readline):
+            (start_row, start_column), (end_row, end_column) = token_info.start, token_info.end
+            if token_info.type == token.ENDMARKER:
+                break
+            if token_info.type == token.NEWLINE or (token_info.type == token.NL and depth == 0):
+                end = start + start_row
+                break
+            if token_info.type == token.OP:
+                depth += (token_info.string in '([{') - (token_info.string in ')]}')
+            color = get_token_color(token_info, previous)
+            previous = token_info.string if token_info.type == token.NAME else None
+            if color is None:
+                continue
+            for row in range(start_row - 1, end_row):
+                while len(line_colors) <= row:
+                    line_colors.append([default_color] * len(lines[start + len(line_colors)]))
+                first = start_column if row == start_row - 1 else 0
+                last = end_column if row == end_row - 1 else len(line_colors[row])
+                line_colors[row][first:last] = [color] * (last - first)
+    except (tokenize.TokenError, SyntaxError):
+        # an unterminated string or bracket runs to the end of the source
+        end = len(lines)
+    while len(line_colors) < end - start:
+        line_colors.append([default_color] * len(lines[start + len(line_colors)]))
+    return line_colors, end
+
+
+class Highlighter(object):
+    """Colors of every character of a source, kept up to date by update"""
+
+    def __init__(self, source=''):
+        self.lines = []
+        self.colors = []
+        self.starts = []  # first line of the logical line each line is in
+        self.update(source)
+
+    def update(self, source):
+        """Tokenizes the lines of source that changed since the last update;
+        returns the range of lines that were tokenized"""
+        lines = source.split('\n')
+        old_lines = self.lines
+        prefix = 0
+        for old_line, line in zip(old_lines, lines):
+            if old_line != line:
+                break
+            prefix += 1
+        if prefix == len(old_lines) == len(lines):
+            return range(0)
+        suffix = 0
+        for old_line, line in zip(reversed(old_lines[prefix:]), reversed(lines[prefix:])):
+            if old_line != line:
+                break
+            suffix += 1
+        shift = len(lines) - len(old_lines)
+
+        # start over from the logical line holding the first change, and stop
+        #  once a logical line starts where one started before the change
+        first = self.starts[prefix] if prefix < len(old_lines) else self.starts[-1] if old_lines else 0
+        colors, starts = self.colors[:first], self.starts[:first]
+        line = first
+        while line < len(lines):
+            old_line = line - shift
+            if line >= len(lines) - suffix and self.starts[old_line] == old_line:
+                colors += self.colors[old_line:]
+                starts += [old_start + shift for old_start in self.starts[old_line:]]
+                break
+            line_colors, end = tokenize_logical_line(lines, line)
+            colors += line_colors
+            starts += [line] * (end - line)
+            line = end
+        self.lines, self.colors, self.starts = lines, colors, starts
+        return range(first, line)
+
+    def get_cells(self, row, tab_size=4):
+        """(character, color) of every cell of a line, with tabs expanded
+        and control characters blanked as layout does"""
+        cells = []
+        for character, color in zip(self.lines[row], self.colors[row]):
+            if character == '\t':
+                cells.extend([(' ', color)] * (tab_size - len(cells) % tab_size))
+            else:
+                cells.append((character.translate(layout.control_translation), color))
+        return tuple(cells)
+
+
+class CodeSheet(object):
+    """Highlighted source drawn a line at a time; draws and prefetches like
+    tiles.TiledSheet so the viewer can use either"""
+
+    def __init__(self, highlighter, font, cell_size, tab_size=4, spare=64, surface_budget=None):
+        self.highlighter = highlighter
+        self.font = font
+        self.cell_size = cell_size
+        self.tab_size = tab_size
+        self.spare = spare
+        self.capacity = spare
+        self.glyphs = {}
+        self.lines = OrderedDict()
+        self.budget = surface_budget or budget.default_budget
+
+    @property
+    def size(self):
+        cell_width, cell_height = self.cell_size
+        lines = self.highlighter.lines
+        return max(map(len, lines), default=0) * cell_width, len(lines) * cell_height
+
+    def get_glyph(self, character, color):
+        key = character, color
+        if key in self.glyphs:
+            self.budget.touch('glyphs', (id(self), key))
+            return self.glyphs[key]
+        glyph = self.glyphs[key] = self.font.render(character, True, color, background)
+        self.budget.add('glyphs', (id(self), key), glyph, self.drop_glyph)
+        return glyph
+
+    def drop_glyph(self, key):
+        owner, glyph_key = key
+        self.glyphs.pop(glyph_key, None)
+
+    def drop_line(self, key):
+        owner, cells = key
+        self.lines.pop(cells, None)
+
+    def release(self):
+        """Forgets every glyph and line, for when the sheet is no longer
+        drawn"""
+        for key in self.glyphs:
+            self.budget.remove('glyphs', (id(self), key))
+        for cells in self.lines:
+            self.budget.remove('lines', (id(self), cells))
+        self.glyphs.clear()
+        self.lines.clear()
+
+    def get_line(self, row):
+        """Surface of a line, rendered when its cells changed since it was
+        last drawn"""
+        cells = self.highlighter.get_cells(row, self.tab_size)
+        if cells in self.lines:
+            self.lines.move_to_end(cells)
+            self.budget.touch('lines', (id(self), cells))
+            return self.lines[cells]
+        cell_width, cell_height = self.cell_size
+        surface = pygame.Surface((len(cells) * cell_width, cell_height + 1))
+        surface.fill(background)
+        blits = []
+        for column, (character, color) in enumerate(cells):
+            if character != ' ':
+                try:
+                    blits.append((self.get_glyph(character, color), (column * cell_width, 0)))
+                except pygame.error:
+                    continue
+        surface.blits(blits, doreturn=False)
+        self.lines[cells] = surface
+        self.budget.add('lines', (id(self), cells), surface, self.drop_line)
+        while len(self.lines) > self.capacity:
+            evicted, evicted_surface = self.lines.popitem(last=False)
+            self.budget.remove('lines', (id(self), evicted))
+        return surface
+
+    def get_visible_rows(self, offset, viewport, margin=0):
+        cell_height = max(self.cell_size[1], 1)
+        first = max(offset[1] // cell_height - margin, 0)
+        last = min((offset[1] + viewport[1] - 1) // cell_height + margin, len(self.highlighter.lines) - 1)
+        return range(first, last + 1)
+
+    def draw(self, surface, offset):
+        x, y = offset
+        cell_height = self.cell_size[1]
+        rows = self.get_visible_rows(offset, surface.get_size())
+        self.capacity = len(rows) * 3 + self.spare
+        surface.blits([(self.get_line(row), (-x, row * cell_height - y)) for row in rows], doreturn=False)
+
+    def prefetch(self, offset, viewport, limit=1):
+        """Renders up to limit lines from the screens above and below the
+        viewport; returns whether any were left to render"""
+        visible = self.get_visible_rows(offset, viewport)
+        rows = [
+            row for row in self.get_visible_rows(offset, viewport, margin=len(visible))
+            if row not in visible and self.highlighter.get_cells(row, self.tab_size) not in self.lines
+        ]
+        for row in rows[:limit]:
+            self.get_line(row)
+        return len(rows) > limit
@@ -0,0 +1,148 @@
+"""
+Hover inspector for the viewer's sheets.
+
+When a text is laid out, the position in the cmap index of the character
+in every cell is worked out at once into a grid, so finding the glyph under
+the mouse is a division for the row, a bisection of the x of the row's
+glyphs for the column (or a second division for sheets drawn on the cell
+grid) and an array lookup.  The tooltip is drawn on
+an overlay: the sheet drawn underneath is kept as a layer and only the
+rectangles the tooltip covered are restored from it, so hovering never
+draws the sheet again.
+"""
+
+import bisect
+import unicodedata
+
+import numpy as np
+import pygame
+
+import layout
+
+text_color = (255, 255, 0)
+background = (32, 32, 32)
+border = (96, 96, 96)
+padding = 4
+
+# distance from the mouse to the tooltip
+cursor_offset = (16, 16)
+
+
+class CellIndex(object):
+    """Position in a cmap.CmapIndex of the character in every cell of a
+    text, -1 where a cell is blank or the font has no glyph.  offsets are
+    the x of every character of every row and of the end of the row, as
+    font_viewer.get_line_offsets gives them; without them the text is taken
+    to be drawn on the cell grid"""
+
+    def __init__(self, text, glyphs, offsets=None):
+        self.glyphs = glyphs
+        self.offsets = offsets
+        cells = layout.layout(text)
+        self.codes = np.zeros(cells.shape, dtype=np.uint32)
+        self.codes[cells.rows, cells.columns] = cells.codes
+        positions = np.searchsorted(glyphs.codepoints, self.codes)
+        positions = np.minimum(positions, max(len(glyphs.codepoints) - 1, 0))
+        found = (glyphs.codepoints[positions] == self.codes) if len(glyphs.codepoints) else np.zeros(cells.shape, bool)
+        self.positions = np.where(found & (self.codes != 0x20), positions, -1).astype(np.int32)
+
+    def lookup(self, x, y, cell_size):
+        """Position of the glyph at a pixel of the sheet, or None"""
+        cell_width, cell_height = cell_size
+        rows, columns = self.positions.shape
+        row = y // max(cell_height, 1)
+        if not 0 <= row < rows:
+            return None
+        if self.offsets is None:
+            column = x // max(cell_width, 1)
+        else:
+            # the last glyph starting at or before x; glyphs that take up no
+            #  room start where the next one does
+            column = bisect.bisect_right(self.offsets[row], x) - 1
+            if x >= self.offsets[row][-1]:
+                return None
+        if not 0 <= column < columns:
+            return None
+        position = int(self.positions[row, column])
+        return None if position < 0 else position
+
+
+def describe(glyphs, position, glyph_metrics=None, point_size=None):
+    """Lines of text about the glyph at a position of a cmap index; bounds
+    are given when the font's metrics are at hand"""
+    code = int(glyphs.codepoints[position])
+    glyph_id = int(glyphs.glyph_ids[position])
+    character = chr(code)
+    lines = [
+        f'U+{code:04X} {character}  {unicodedata.name(character, "")}'.rstrip(),
+        f'glyph {glyphs.glyph_names[glyph_id]} (id {glyph_id})',
+    ]
+    advance = int(glyphs.advances[position])
+    if glyph_metrics is None:
+        lines.append(f'advance {advance}px')
+        return lines
+    units_per_em = glyph_metrics.units_per_em
+    pixels = f', {advance * point_size / units_per_em:.1f}px' if point_size else ''
+    lines.append(f'advance {advance} units{pixels}')
+    if glyph_metrics.empty[glyph_id]:
+        lines.append('bounds: empty')
+    else:
+        x_min, y_min, x_max, y_max = glyph_metrics.bounds[glyph_id].tolist()
+        lines.append(f'bounds ({x_min}, {y_min}) to ({x_max}, {y_max})')
+    return lines
+
+
+def render_tooltip(font, lines):
+    surfaces = [font.render(line, True, text_color, background) for line in lines]
+    width = max(surface.get_width() for surface in surfaces) + 2 * padding
+    height = sum(surface.get_height() for surface in surfaces) + 2 * padding
+    tooltip = pygame.Surface((width, height))
+    tooltip.fill(background)
+    pygame.draw.rect(tooltip, border, tooltip.get_rect(), 1)
+    y = padding
+    for surface in surfaces:
+        tooltip.blit(surface, (padding, y))
+        y += surface.get_height()
+    return tooltip
+
+
+class Overlay(object):
+    """Draws a tooltip over a screen, restoring what it covered from a copy
+    of the screen taken after the last full draw"""
+
+    def __init__(self):
+        self.layer = None
+        self.rect = None
+
+    def capture(self, screen):
+        """Keeps what was just drawn as the layer under the tooltip"""
+        if self.layer is None or self.layer.get_size() != screen.get_size():
+            self.layer = screen.copy()
+        else:
+            self.layer.blit(screen, (0, 0))
+        self.rect = None
+
+    def release(self):
+        self.layer = None
+        self.rect = None
+
+    def show(self, screen, tooltip, position):
+        """Moves the tooltip to position (or hides it, given None); returns
+        the rectangles of the screen that changed"""
+        changed = []
+        if self.rect:
+            screen.blit(self.layer, self.rect, self.rect)
+            changed.append(self.rect)
+            self.rect = None
+        if tooltip is not None:
+            rect = tooltip.get_rect(topleft=(position[0] + cursor_offset[0], position[1] + cursor_offset[1]))
+            # flip to the other side of the mouse rather than off screen
+            if rect.right > screen.get_width():
+                rect.right = position[0] - cursor_offset[0]
+            if rect.bottom > screen.get_height():
+                rect.bottom = position[1] - cursor_offset[1]
+            rect.clamp_ip(screen.get_rect())
+            screen.blit(tooltip, rect)
+            self.rect = rect
+            changed.append(rect)
+        return changed
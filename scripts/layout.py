@@ -0,0 +1,58 @@
+"""
+Lays text out on a fixed-width character grid.
+
+Control characters are mapped with a single precomputed str.translate
+table and long lines are wrapped by slicing, so even very large texts are
+laid out without visiting characters one at a time in Python.
+"""
+
+from collections import namedtuple
+
+import numpy as np
+
+# Latin-1 characters without a printable representation: C0, DEL, C1,
+#  no-break space and soft hyphen
+hidden_characters = ''.join(chr(code) for code in range(0x100) if not chr(code).isprintable())
+hidden_codes = frozenset(map(ord, hidden_characters))
+
+# every hidden character, except line breaks, takes up a blank cell
+control_translation = str.maketrans(dict.fromkeys(hidden_characters.replace('\n', ''), ' '))
+
+Layout = namedtuple('Layout', 'text, codes, rows, columns, shape')
+
+
+def is_visible(code):
+    return code not in hidden_codes
+
+
+def wrap_lines(text, width=None, tab_size=None):
+    """Splits text into grid rows: tabs are expanded to tab_size columns
+    (or a single blank cell), control characters become blank cells and,
+    given a width, lines are wrapped every width characters"""
+    if tab_size:
+        text = text.expandtabs(tab_size)
+    lines = text.translate(control_translation).split('\n')
+    if not width:
+        return lines
+    return [
+        line[start:start + width]
+        for line in lines
+        for start in range(0, len(line) or 1, width)
+    ]
+
+
+def wrap_text(text, width=None, tab_size=None):
+    return '\n'.join(wrap_lines(text, width=width, tab_size=tab_size))
+
+
+def layout(text, width=None, tab_size=None):
+    """Lays text out into rows and returns a Layout with the wrapped text
+    and, for every cell, its codepoint, row and column as arrays"""
+    lines = wrap_lines(text, width=width, tab_size=tab_size)
+    lengths = np.fromiter(map(len, lines), dtype=np.int64, count=len(lines))
+    codes = np.frombuffer(''.join(lines).encode('utf-32-le'), dtype=np.uint32)
+    rows = np.repeat(np.arange(len(lines), dtype=np.int32), lengths)
+    starts = np.cumsum(lengths) - lengths
+    columns = (np.arange(len(codes)) - np.repeat(starts, lengths)).astype(np.int32)
+    shape = len(lines), int(lengths.max(initial=0))
+    return Layout('\n'.join(lines), codes, rows, columns, shape)
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Checks that a font really is monospaced, at every size it is exported at.
+
+Usage: metrics.py [OPTIONS] [FONTS]...
+
+  FONTS are font paths [default: every font in <repo>/fonts]
+
+Options:
+  -p, --point-size SIZE  Point size(s) to check [default: 6-31]
+  -o, --output PATH      Write the JSON report to PATH [default: stdout]
+  --help                 Show this message and exit.
+
+Checks, for every glyph:
+    - its advance is the cell width (that of .notdef)
+    - its outline stays inside the cell: between 0 and the advance, and
+      between the descender and the ascender
+    - combining marks with no advance (GDEF mark class, or Unicode category
+      Mn) are drawn over the cell before them, so they are exempt from the
+      advance checks and their outline is checked against that cell
+    - at each point size, its advance rounds to the same whole number of
+      pixels as the cell, and its outline, rounded out to whole pixels,
+      does not spill into the neighbouring cells
+
+Notes:
+    - hmtx and glyf are read into arrays once and every glyph is checked
+      at every size at once, so a font takes a few milliseconds
+    - pixel checks round the way FreeType does without hinting
+    - exits with 1 when any check fails
+"""
+
+import importlib
+import json
+import os
+import sys
+import time
+import unicodedata
+from collections import namedtuple
+from pathlib import Path
+
+import click
+import numpy as np
+from fontTools.pens.boundsPen import BoundsPen
+from fontTools.ttLib import TTFont
+
+GlyphMetrics = namedtuple('GlyphMetrics', 'names, codepoints, advances, bounds, empty, marks, ascent, descent, units_per_em')
+
+# GDEF glyph class of combining marks
+mark_glyph_class = 3
+
+
+def read_glyph_metrics(font):
+    """Advances and (xMin, yMin, xMax, yMax) bounds of every glyph, in glyph
+    order; empty glyphs have zero bounds.  Marks are the glyphs GDEF
+    classes as marks or that are mapped from a nonspacing mark (Mn)"""
+    names = font.getGlyphOrder()
+    hmtx = font['hmtx']
+    advances = np.array([hmtx[name][0] for name in names], dtype=np.int64)
+
+    bounds = np.zeros((len(names), 4), dtype=np.int64)
+    empty = np.zeros(len(names), dtype=bool)
+    if 'glyf' in font:
+        glyf = font['glyf']
+        for index, name in enumerate(names):
+            glyph = glyf[name]
+            if glyph.numberOfContours == 0:
+                empty[index] = True
+            else:
+                bounds[index] = glyph.xMin, glyph.yMin, glyph.xMax, glyph.yMax
+    else:
+        glyph_set = font.getGlyphSet()
+        for index, name in enumerate(names):
+            pen = BoundsPen(glyph_set)
+            glyph_set[name].draw(pen)
+            if pen.bounds is None:
+                empty[index] = True
+            else:
+                bounds[index] = pen.bounds
+
+    codepoints = {}
+    for code, name in sorted(font.getBestCmap().items()):
+        codepoints.setdefault(name, code)
+
+    glyph_classes = {}
+    if 'GDEF' in font and font['GDEF'].table.GlyphClassDef:
+        glyph_classes = font['GDEF'].table.GlyphClassDef.classDefs
+    marks = np.array([
+        glyph_classes.get(name) == mark_glyph_class
+        or (name in codepoints and unicodedata.category(chr(codepoints[name])) == 'Mn')
+        for name in names
+    ], dtype=bool)
+
+    hhea = font['hhea']
+    return GlyphMetrics(names, codepoints, advances, bounds, empty, marks, hhea.ascent, hhea.descent, font['head'].unitsPerEm)
+
+
+def get_cell_advance(glyph_metrics):
+    """Advance every glyph should have: that of .notdef, or failing that
+    the most common one"""
+    if '.notdef' in glyph_metrics.names:
+        return int(glyph_metrics.advances[glyph_metrics.names.index('.notdef')])
+    values, counts = np.unique(glyph_metrics.advances, return_counts=True)
+    return int(values[counts.argmax()])
+
+
+def scale(units, point_sizes, units_per_em):
+    """Font units (glyphs, ...) to pixels (glyphs, ..., sizes)"""
+    return np.asarray(units)[..., None] * np.asarray(point_sizes) / units_per_em
+
+
+def round_pixels(pixels):
+    return np.floor(pixels + 0.5).astype(np.int64)
+
+
+def check_font(glyph_metrics, point_sizes):
+    """Report of every failed check; see the module docstring"""
+    names = np.array(glyph_metrics.names, dtype=object)
+    advances = glyph_metrics.advances
+    x_min, y_min, x_max, y_max = glyph_metrics.bounds.T
+    drawn = ~glyph_metrics.empty
+    cell_advance = get_cell_advance(glyph_metrics)
+    point_sizes = np.array(list(point_sizes))
+
+    # Font units; empty zero-width glyphs (e.g. .null) take up no cell, and
+    #  zero-width marks are drawn over the cell before them
+    zero_width = (advances == 0) & ~drawn
+    marks = (advances == 0) & drawn & glyph_metrics.marks
+    x_min, x_max = x_min + np.where(marks, cell_advance, 0), x_max + np.where(marks, cell_advance, 0)
+    mismatched = (advances != cell_advance) & ~zero_width & ~marks
+    spills = {
+        'left': np.where(drawn, -x_min, 0),
+        'right': np.where(drawn, x_max - cell_advance, 0),
+        'top': np.where(drawn, y_max - glyph_metrics.ascent, 0),
+        'bottom': np.where(drawn, glyph_metrics.descent - y_min, 0),
+    }
+
+    # Pixels, as (glyphs, sizes)
+    units_per_em = glyph_metrics.units_per_em
+    cell_width = round_pixels(scale(cell_advance, point_sizes, units_per_em))
+    pixel_advances = round_pixels(scale(advances, point_sizes, units_per_em))
+    # FreeType rounds the line out to whole pixels
+    ascent = np.ceil(scale(glyph_metrics.ascent, point_sizes, units_per_em))
+    descent = np.floor(scale(glyph_metrics.descent, point_sizes, units_per_em))
+    pixel_spills = np.stack([
+        -np.floor(scale(x_min, point_sizes, units_per_em)),
+        np.ceil(scale(x_max, point_sizes, units_per_em)) - cell_width,
+        np.ceil(scale(y_max, point_sizes, units_per_em)) - ascent,
+        descent - np.floor(scale(y_min, point_sizes, units_per_em)),
+    ], axis=-1).astype(np.int64)
+    pixel_spills = np.where(drawn[:, None, None], np.maximum(pixel_spills, 0), 0)
+    pixel_mismatched = (pixel_advances != cell_width) & ~(zero_width | marks)[:, None]
+    overflowing = pixel_spills.any(axis=-1)
+
+    flagged = set(names[mismatched]) | set(names[overflowing.any(axis=1)])
+    sizes = {}
+    for index, point_size in enumerate(point_sizes.tolist()):
+        sizes[point_size] = {
+            'cell': [int(cell_width[index]), int(ascent[index] - descent[index])],
+            'advance_error': cell_advance * point_size / units_per_em - int(cell_width[index]),
+            'advance_mismatches': names[pixel_mismatched[:, index]].tolist(),
+            'overflow': {
+                name: dict(zip(spills, spill))
+                for name, spill in zip(names[overflowing[:, index]], pixel_spills[overflowing[:, index], index].tolist())
+            },
+        }
+
+    return {
+        'units_per_em': units_per_em,
+        'advance': cell_advance,
+        'glyphs': len(names),
+        'advances': {
+            'mismatched': dict(zip(names[mismatched], advances[mismatched].tolist())),
+            'zero_width': names[zero_width].tolist(),
+            'marks': names[marks].tolist(),
+        },
+        'bounds': {
+            side: dict(zip(names[spill > 0], spill[spill > 0].tolist()))
+            for side, spill in spills.items()
+        },
+        'sizes': sizes,
+        'codepoints': {
+            name: f'U+{glyph_metrics.codepoints[name]:04X}'
+            for name in sorted(flagged) if name in glyph_metrics.codepoints
+        },
+        'passed': not flagged,
+    }
+
+
+@click.command()
+@click.argument('fonts', nargs=-1, type=click.Path(exists=True, dir_okay=False, path_type=Path))
+@click.option('-p', '--point-size', 'point_sizes', metavar='SIZE', multiple=True, type=int, help='Point size(s) to check')
+@click.option('-o', '--output', metavar='PATH', type=click.Path(path_type=Path), help='Write the JSON report to PATH')
+def main(fonts, point_sizes, output):
+    # font-viewer imports this module for its metrics, so it is only
+    #  imported here, for the repo and the exported sizes
+    os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+    font_viewer = importlib.import_module('font-viewer')
+    font_paths = fonts or sorted((font_viewer.this_repo / 'fonts').glob('*.ttf'))
+    point_sizes = point_sizes or font_viewer.BITMAP_POINT_SIZES
+
+    report = {}
+    for font_path in font_paths:
+        start = time.perf_counter()
+        glyph_metrics = read_glyph_metrics(TTFont(str(font_path)))
+        loaded = time.perf_counter()
+        font_report = report[font_path.stem] = check_font(glyph_metrics, point_sizes)
+        checked = time.perf_counter()
+        overflowing = {name for size in font_report['sizes'].values() for name in size['overflow']}
+        click.echo(
+            f'{font_path.stem}: {"passed" if font_report["passed"] else "FAILED"}, '
+            f'{len(font_report["advances"]["mismatched"])} advances differ, '
+            f'{len(overflowing)} glyphs overflow their cell; '
+            f'loaded in {(loaded - start) * 1000:.1f}ms, checked in {(checked - loaded) * 1000:.1f}ms',
+            err=True,
+        )
+
+    text = json.dumps(report, indent=2)
+    if output:
+        output.write_text(text)
+    else:
+        click.echo(text)
+    sys.exit(0 if all(font_report['passed'] for font_report in report.values()) else 1)
+
+
+if __name__ == '__main__':
+    main()
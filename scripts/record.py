@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Records animated previews of the sheets (size sweeps, text and color
+cycling) as APNG or GIF without opening a window.
+
+Usage: record.py [OPTIONS] [FONT]
+
+Options:
+  -o, --output PATH      An .apng, .png or .gif file
+                         [default: <repo>/recordings/<font>-<texts>.png]
+  -t, --text NAME        Text(s) to record, one after the other
+                         [default: cp437]
+  -s, --sizes FIRST-LAST Point sizes to sweep through, e.g. 31-6 to sweep
+                         down [default: 6-31]
+  -c, --color-cycles COUNT
+                         Frames of color cycling at each size; 0 records
+                         without colors [default: 0]
+  -d, --duration MS      Milliseconds per frame [default: 100]
+  --seed NUMBER          Seed for the color cycling [default: 0]
+  --help                 Show this message and exit.
+
+Notes:
+    - frames come from the same pipeline as exported sheets; a state that
+      repeats (e.g. the way back of a sweep) is only rendered once
+    - every frame shares one palette built from colors.py, frames that do
+      not change are merged into the previous one and only the region that
+      changed is stored for the rest
+"""
+
+import importlib
+import os
+import random
+import time
+from pathlib import Path
+
+import click
+import numpy as np
+from PIL import Image
+
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+font_viewer = importlib.import_module('font-viewer')
+
+gray_levels = 64
+palette_size = 256
+formats = {'.png': 'PNG', '.apng': 'PNG', '.gif': 'GIF'}
+
+
+def get_cycle_colors(count=palette_size - gray_levels):
+    """Evenly spaced picks from colors.py to use for color cycling"""
+    colors = sorted(set(map(tuple, font_viewer.color_data.values())) - {font_viewer.black})
+    picks = np.linspace(0, len(colors) - 1, min(count, len(colors))).round().astype(int)
+    return [colors[pick] for pick in picks]
+
+
+def get_palette_image(cycle_colors):
+    """A 'P' image holding the palette shared by every frame: a ramp of
+    grays for antialiased white text followed by the cycle colors"""
+    ramp = np.linspace(0, 255, gray_levels).round().astype(np.uint8)
+    palette = np.concatenate([np.repeat(ramp[:, None], 3, axis=1), np.array(cycle_colors, dtype=np.uint8)])
+    palette_image = Image.new('P', (1, 1))
+    palette_image.putpalette(palette.ravel().tolist())
+    return palette_image
+
+
+def parse_sizes(sizes):
+    first, _, last = sizes.partition('-')
+    first, last = int(first), int(last or first)
+    step = 1 if last >= first else -1
+    return list(range(first, last + step, step))
+
+
+def get_states(text_names, point_sizes, color_cycles):
+    """(text name, point size, color step) of every frame, in order;
+    a color step of None records without colors"""
+    color_steps = range(color_cycles) if color_cycles else [None]
+    return [
+        (text_name, point_size, color_step)
+        for text_name in text_names
+        for point_size in point_sizes
+        for color_step in color_steps
+    ]
+
+
+class Recorder(object):
+    """Renders states offscreen into palette indices, once per state"""
+
+    def __init__(self, font_path, seed=0):
+        self.font_path = font_path
+        self.glyphs = font_viewer.cmap.get_cmap_index(font_path)
+        self.cycle_colors = get_cycle_colors()
+        self.palette_image = get_palette_image(self.cycle_colors)
+        self.seed = seed
+        self.fonts = {}
+        self.texts = {}
+        self.color_maps = {}
+        self.frames = {}
+        self.rendered = 0
+
+    def get_font(self, point_size):
+        if point_size not in self.fonts:
+            font = font_viewer.load_font(self.font_path, point_size)
+            renders = font_viewer.budget.BudgetedDict('renders')
+            symbols, font_dimensions = font_viewer.get_font_dimensions(font, point_size, self.glyphs, renders)
+            self.fonts[point_size] = font, font_dimensions, renders
+        return self.fonts[point_size]
+
+    def get_text(self, text_name):
+        if text_name not in self.texts:
+            self.texts[text_name] = font_viewer.get_text(text_name, self.glyphs)
+        return self.texts[text_name]
+
+    def get_colors(self, color_step):
+        """The same random colors for a step at every size, so that a sweep
+        only changes the size"""
+        if color_step is None:
+            return None
+        if color_step not in self.color_maps:
+            generator = random.Random(f'{self.seed}:{color_step}')
+            self.color_maps[color_step] = {
+                chr(code): generator.choice(self.cycle_colors)
+                for code in self.glyphs.codepoints.tolist()
+            }
+        return self.color_maps[color_step]
+
+    def render(self, state):
+        """Palette indices (rows, columns) of one state"""
+        if state not in self.frames:
+            text_name, point_size, color_step = state
+            font, font_dimensions, renders = self.get_font(point_size)
+            surface = font_viewer.render_text_surface(
+                self.get_text(text_name), font, font_dimensions,
+                colors=self.get_colors(color_step), ignore_whitespace=True, renders=renders,
+            )
+            pixels = font_viewer.pygame.surfarray.array3d(surface).transpose(1, 0, 2)
+            image = Image.fromarray(np.ascontiguousarray(pixels), 'RGB')
+            image = image.quantize(palette=self.palette_image, dither=Image.Dither.NONE)
+            self.frames[state] = np.asarray(image)
+            self.rendered += 1
+        return self.frames[state]
+
+    def record(self, states, duration):
+        """Frames padded to a common canvas, and how long to show each;
+        frames identical to the one before are merged into it"""
+        frames = [self.render(state) for state in states]
+        height = max(frame.shape[0] for frame in frames)
+        width = max(frame.shape[1] for frame in frames)
+        canvas = np.zeros((height, width), dtype=np.uint8)
+
+        merged, durations, changed = [], [], 0
+        for frame in frames:
+            previous = canvas.copy()
+            canvas[:] = 0
+            canvas[:frame.shape[0], :frame.shape[1]] = frame
+            difference = canvas != previous
+            if merged and not difference.any():
+                durations[-1] += duration
+                continue
+            changed += np.count_nonzero(difference)
+            merged.append(canvas.copy())
+            durations.append(duration)
+        return merged, durations, changed / (len(merged) * canvas.size)
+
+    def save(self, frames, durations, output):
+        images = []
+        for frame in frames:
+            image = Image.fromarray(frame, 'P')
+            image.putpalette(self.palette_image.getpalette())
+            images.append(image)
+
+        options = dict(save_all=True, append_images=images[1:], duration=durations, loop=0)
+        if formats[output.suffix.lower()] == 'GIF':
+            # leave each frame in place so the next only stores what changed
+            options.update(disposal=1, optimize=False)
+        else:
+            options.update(disposal=0, blend=0)
+        images[0].save(output, format=formats[output.suffix.lower()], **options)
+
+
+@click.command()
+@click.argument('font-name', metavar='FONT', required=False, default='Deferral-Regular')
+@click.option('-o', '--output', metavar='PATH', type=click.Path(path_type=Path), help='An .apng, .png or .gif file')
+@click.option('-t', '--text', 'text_names', metavar='NAME', multiple=True, help='Text(s) to record, one after the other')
+@click.option('-s', '--sizes', metavar='FIRST-LAST', default='6-31', help='Point sizes to sweep through')
+@click.option('-c', '--color-cycles', metavar='COUNT', default=0, type=int, help='Frames of color cycling at each size')
+@click.option('-d', '--duration', metavar='MS', default=100, type=int, help='Milliseconds per frame')
+@click.option('--seed', metavar='NUMBER', default=0, type=int, help='Seed for the color cycling')
+def main(font_name, output, text_names, sizes, color_cycles, duration, seed):
+    font_path = font_viewer.find_font(font_name)
+    if font_path is None:
+        raise click.BadParameter(f'could not find {font_name}', param_hint='FONT')
+    text_names = text_names or ('cp437',)
+    output = output or font_viewer.this_repo / 'recordings' / f'{font_path.stem}-{"-".join(text_names)}.png'
+    if output.suffix.lower() not in formats:
+        raise click.BadParameter(f'must end in one of {", ".join(formats)}', param_hint='--output')
+    output.parent.mkdir(parents=True, exist_ok=True)
+
+    font_viewer.init_headless()
+    start = time.perf_counter()
+    recorder = Recorder(font_path, seed=seed)
+    states = get_states(text_names, parse_sizes(sizes), color_cycles)
+    frames, durations, changed = recorder.record(states, duration)
+    recorder.save(frames, durations, output)
+    click.echo(
+        f'{output}: {len(states)} frames ({recorder.rendered} rendered, {len(frames)} stored, '
+        f'{changed:.0%} of pixels changed per frame), {output.stat().st_size} bytes '
+        f'in {time.perf_counter() - start:.2f}s'
+    )
+
+
+if __name__ == '__main__':
+    main()
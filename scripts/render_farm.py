@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Exports the bitmap sheets of several fonts with a pool of worker processes.
+
+Usage: render_farm.py [OPTIONS] [FONTS]...
+
+  FONTS are font names or paths [default: Deferral-Regular, Deferral-Square]
+
+Options:
+  -j, --jobs COUNT       Worker processes [default: one per core]
+  -p, --point-size SIZE  Point size(s) to export [default: 6-31]
+  -c, --codepage NAME    Codepage sheet(s) to export, or "all"
+                         [default: cp437, cp850]
+  -o, --output PATH      Folder to write PNGs to [default: <repo>/bitmaps]
+  -q, --quiet            Only print the summary
+  --benchmark            Export into a temporary folder with 1, 2, 4, ...
+                         up to --jobs workers and print how the time scales
+  --help                 Show this message and exit.
+
+Notes:
+    - a job is every sheet of one font at one point size, so the sheets of
+      a job share their glyph renders; jobs are handed out largest first
+    - workers only get font paths and job tuples; each keeps its own cmap
+      indexes and writes finished sheets into shared memory, which this
+      process encodes to PNG in place (no pickled pixels) and frees, also
+      when the export is interrupted
+    - writes the same files as font-viewer.py --export
+"""
+
+import importlib
+import multiprocessing
+import os
+import secrets
+import signal
+import tempfile
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import resource_tracker, shared_memory
+from pathlib import Path
+
+import click
+import numpy as np
+
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+font_viewer = importlib.import_module('font-viewer')
+pygame = font_viewer.pygame
+
+Job = namedtuple('Job', 'font_path, font_name, point_size, text_names')
+
+# a finished sheet: the shared memory holding its RGB pixels and its size
+Sheet = namedtuple('Sheet', 'text_name, memory_name, size')
+
+# a job and the names of the shared memory its sheets go into
+Task = namedtuple('Task', 'job, memory_names')
+
+JobResult = namedtuple('JobResult', 'job, sheets, worker, seconds')
+
+
+def get_jobs(font_paths, point_sizes, text_names):
+    """Every (font, point size), the largest sizes (slowest jobs) first so
+    that the last jobs to finish are short ones"""
+    jobs = [
+        Job(font_path, font_path.stem, point_size, tuple(text_names))
+        for font_path in font_paths
+        for point_size in point_sizes
+    ]
+    return sorted(jobs, key=lambda job: -job.point_size)
+
+
+def get_tasks(jobs):
+    """Jobs with the names of the shared memory of each sheet; names are
+    kept short for macOS, which allows 31 characters"""
+    prefix = f'rf{secrets.token_hex(4)}'
+    return [
+        Task(job, [f'{prefix}_{index}_{sheet}' for sheet in range(len(job.text_names))])
+        for index, job in enumerate(jobs)
+    ]
+
+
+def init_worker():
+    font_viewer.init_headless()
+    # SDL catches both signals to post QUIT events; interrupts are handled
+    #  by the parent instead, and it stops the pool with SIGTERM
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+
+def share_surface(surface, memory_name):
+    """Copies a surface's pixels into a new shared memory block, which the
+    process that encodes them unlinks"""
+    width, height = surface.get_size()
+    memory = shared_memory.SharedMemory(name=memory_name, create=True, size=max(width * height * 3, 1))
+    pixels = np.ndarray((height, width, 3), dtype=np.uint8, buffer=memory.buf)
+    pixels[:] = pygame.surfarray.pixels3d(surface).transpose(1, 0, 2)
+    del pixels
+    # the block outlives this worker: leave it to the encoder to unlink
+    resource_tracker.unregister(memory._name, 'shared_memory')
+    memory.close()
+    return memory.name
+
+
+def render_job(task):
+    """Renders every sheet of a job, as font_viewer.export_bitmaps does"""
+    start = time.perf_counter()
+    job = task.job
+    glyphs = font_viewer.cmap.get_cmap_index(job.font_path)
+    renders = {}
+    sheets = []
+    for text_name, memory_name in zip(job.text_names, task.memory_names):
+        surface = font_viewer.render_sheet(job.font_path, job.point_size, text_name, glyphs=glyphs, renders=renders)
+        sheets.append(Sheet(text_name, share_surface(surface, memory_name), surface.get_size()))
+    return JobResult(job, sheets, os.getpid(), time.perf_counter() - start)
+
+
+def save_sheet(sheet, path):
+    """Encodes a sheet straight from its shared memory, then frees it"""
+    memory = shared_memory.SharedMemory(name=sheet.memory_name)
+    try:
+        surface = pygame.image.frombuffer(memory.buf, sheet.size, 'RGB')
+        pygame.image.save(surface, str(path))
+        del surface
+    finally:
+        memory.close()
+        memory.unlink()
+
+
+def free_memory(memory_name):
+    """Unlinks a shared memory block, if it was ever created"""
+    try:
+        memory = shared_memory.SharedMemory(name=memory_name)
+    except FileNotFoundError:
+        return
+    memory.close()
+    memory.unlink()
+
+
+def run_farm(jobs, output, workers, progress=None):
+    """Renders jobs with a pool of workers and saves every sheet into
+    output; progress(done, total, result) is called as each job is saved.
+    Returns the results in the order they finished"""
+    output.mkdir(parents=True, exist_ok=True)
+    tasks = get_tasks(jobs)
+    results = []
+    pending = []
+    try:
+        with multiprocessing.Pool(workers, initializer=init_worker) as pool, ThreadPoolExecutor(workers) as encoders:
+            for result in pool.imap_unordered(render_job, tasks):
+                saves = [
+                    encoders.submit(save_sheet, sheet, output / f'{result.job.font_name}-{result.job.point_size:>02}-{sheet.text_name}.png')
+                    for sheet in result.sheets
+                ]
+                pending.append((result, saves))
+                while pending and all(save.done() for save in pending[0][1]):
+                    finish(pending.pop(0), results, progress, len(jobs))
+            for entry in pending:
+                finish(entry, results, progress, len(jobs))
+    finally:
+        # the pool is stopped and every save has run by now: whatever is
+        #  left was rendered, or half rendered, and never encoded
+        if len(results) < len(tasks):
+            for task in tasks:
+                for memory_name in task.memory_names:
+                    free_memory(memory_name)
+    return results
+
+
+def finish(entry, results, progress, total):
+    result, saves = entry
+    for save in saves:
+        save.result()
+    results.append(result)
+    if progress:
+        progress(len(results), total, result)
+
+
+def echo_progress(done, total, result):
+    job = result.job
+    click.echo(
+        f'[{done:>{len(str(total))}}/{total}] {job.font_name} {job.point_size}pt: '
+        f'{", ".join(job.text_names)} in {result.seconds * 1000:.0f}ms (worker {result.worker})',
+        err=True,
+    )
+
+
+def summarize(results, seconds, workers):
+    sheets = sum(len(result.sheets) for result in results)
+    busy = sum(result.seconds for result in results)
+    slowest = max(results, key=lambda result: result.seconds)
+    return (
+        f'{len(results)} jobs, {sheets} sheets in {seconds:.2f}s with {workers} workers '
+        f'({sheets / seconds:.1f} sheets/s, workers busy {busy / (seconds * workers):.0%}, '
+        f'slowest job {slowest.job.font_name} {slowest.job.point_size}pt {slowest.seconds * 1000:.0f}ms)'
+    )
+
+
+def get_worker_counts(workers):
+    """1, 2, 4, ... and workers itself"""
+    counts = [1]
+    while counts[-1] * 2 < workers:
+        counts.append(counts[-1] * 2)
+    return counts + [workers] if workers > 1 else counts
+
+
+@click.command()
+@click.argument('fonts', nargs=-1)
+@click.option('-j', '--jobs', 'workers', metavar='COUNT', default=os.cpu_count() or 1, type=click.IntRange(min=1), help='Worker processes')
+@click.option('-p', '--point-size', 'point_sizes', metavar='SIZE', multiple=True, type=int, help='Point size(s) to export')
+@click.option('-c', '--codepage', 'codepage_names', metavar='NAME', multiple=True, help='Codepage sheet(s) to export, or "all"')
+@click.option('-o', '--output', metavar='PATH', type=click.Path(path_type=Path), help='Folder to write PNGs to')
+@click.option('-q', '--quiet', is_flag=True, help='Only print the summary')
+@click.option('--benchmark', is_flag=True, help='Print how the time scales with the number of workers')
+def main(fonts, workers, point_sizes, codepage_names, output, quiet, benchmark):
+    font_paths = font_viewer.find_fonts(fonts or font_viewer.BITMAP_FONTS)
+    point_sizes = point_sizes or font_viewer.BITMAP_POINT_SIZES
+    text_names = [*font_viewer.codepages.get_codepages(codepage_names), 'glyphs']
+    output = output or font_viewer.this_repo / 'bitmaps'
+    jobs = get_jobs(font_paths, point_sizes, text_names)
+
+    if benchmark:
+        click.echo(f'{len(font_paths)} fonts x {len(point_sizes)} sizes x {len(text_names)} sheets, {os.cpu_count()} cores')
+        click.echo('workers  seconds  speedup  efficiency')
+        baseline = None
+        for count in get_worker_counts(workers):
+            with tempfile.TemporaryDirectory() as folder:
+                start = time.perf_counter()
+                run_farm(jobs, Path(folder), count)
+                seconds = time.perf_counter() - start
+            baseline = baseline or seconds
+            click.echo(f'{count:>7}  {seconds:>7.2f}  {baseline / seconds:>6.2f}x  {baseline / seconds / count:>10.0%}')
+        return
+
+    for font_path in font_paths:
+        font_viewer.report_missing(font_viewer.cmap.get_cmap_index(font_path), text_names, font_path.stem)
+    start = time.perf_counter()
+    results = run_farm(jobs, output, workers, progress=None if quiet else echo_progress)
+    click.echo(f'{output}: {summarize(results, time.perf_counter() - start, workers)}')
+
+
+if __name__ == '__main__':
+    main()
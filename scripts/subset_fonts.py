@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Builds per-codepage subsets of every font style.
+
+Usage: subset_fonts.py [OPTIONS] [FONTS]...
+
+  FONTS are font names or paths [default: every font in <repo>/fonts]
+
+Options:
+  -c, --codepage NAME    Codepage(s) to subset to, "ascii" or "all"
+                         [default: ascii, cp437, cp850]
+  -o, --output PATH      Output folder [default: <repo>/fonts/subsets]
+  -j, --jobs COUNT       Styles subset in parallel [default: one per CPU]
+  -r, --repeat COUNT     Loads per font when timing [default: 20]
+  --help                 Show this message and exit.
+
+Notes:
+    - subsets are named <font>-<codepage>.ttf and are only rebuilt when
+      the source font, the codepoints or fontTools change
+    - prints (and writes to report.json) the size and load-time savings
+      of every subset
+"""
+
+import hashlib
+import importlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import click
+import fontTools
+from fontTools import subset
+from fontTools.ttLib import TTFont
+
+import codepages
+
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+font_viewer = importlib.import_module('font-viewer')
+
+ascii_codepoints = tuple(range(0x20, 0x7F))
+manifest_name = '.manifest.json'
+
+
+def get_target_codepoints(target):
+    """Codepoints a subset target (a codepage or "ascii") needs"""
+    if target == 'ascii':
+        return set(ascii_codepoints)
+    return set(codepages.get_codepage_codepoints(codepages.get_codepage(target)).tolist())
+
+
+def get_cache_key(font_hash, target, codepoints):
+    key = hashlib.sha256()
+    key.update(f'{font_hash}:{target}:{fontTools.version}:'.encode())
+    key.update(','.join(map(str, sorted(codepoints))).encode())
+    return key.hexdigest()
+
+
+def hash_file(path):
+    return hashlib.sha256(Path(path).read_bytes()).hexdigest()
+
+
+def subset_font(font_path, jobs):
+    """Writes every (output path, codepoints) subset job for one style;
+    runs in a worker process"""
+    options = subset.Options()
+    options.notdef_outline = True
+    options.name_IDs = ['*']
+    options.name_languages = ['*']
+    options.glyph_names = True
+    options.layout_features = ['*']
+    written = []
+    for output_path, codepoints in jobs:
+        font = TTFont(str(font_path))
+        subsetter = subset.Subsetter(options=options)
+        subsetter.populate(unicodes=codepoints)
+        subsetter.subset(font)
+        font.save(str(output_path))
+        written.append(str(output_path))
+    return written
+
+
+def time_parse(font_path, repeat):
+    """Seconds to parse a font fully with fontTools (decompressing web
+    fonts), averaged over repeat loads"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        font = TTFont(str(font_path))
+        for tag in font.keys():
+            font[tag]
+    return (time.perf_counter() - start) / repeat
+
+
+def time_loads(font_path, repeat):
+    """Seconds to parse a font fully with fontTools and to open it with
+    pygame, each averaged over repeat loads"""
+    parse = time_parse(font_path, repeat)
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        font_viewer.pygame.font.Font(str(font_path), 16)
+    load = (time.perf_counter() - start) / repeat
+    return parse, load
+
+
+def load_manifest(output):
+    manifest_path = output / manifest_name
+    if manifest_path.exists():
+        return json.loads(manifest_path.read_text())
+    return {}
+
+
+@click.command()
+@click.argument('fonts', nargs=-1)
+@click.option('-c', '--codepage', 'targets', metavar='NAME', multiple=True, help='Codepage(s) to subset to, "ascii" or "all"')
+@click.option('-o', '--output', metavar='PATH', type=click.Path(path_type=Path), help='Output folder')
+@click.option('-j', '--jobs', metavar='COUNT', type=int, help='Styles subset in parallel')
+@click.option('-r', '--repeat', metavar='COUNT', default=20, type=int, help='Loads per font when timing')
+def main(fonts, targets, output, jobs, repeat):
+    font_paths = font_viewer.find_fonts(fonts)
+    targets = targets or ('ascii', *codepages.preferred_codepages)
+    if 'all' in targets:
+        targets = ('ascii', *codepages.get_codepage_names())
+    output = output or font_viewer.this_repo / 'fonts' / 'subsets'
+    output.mkdir(parents=True, exist_ok=True)
+
+    manifest = load_manifest(output)
+    work = {}
+    for font_path in font_paths:
+        font_hash = hash_file(font_path)
+        font_codepoints = set(font_viewer.cmap.get_cmap_index(font_path).codepoints.tolist())
+        for target in targets:
+            codepoints = sorted(get_target_codepoints(target) & font_codepoints)
+            output_path = output / f'{font_path.stem}-{target}.ttf'
+            key = get_cache_key(font_hash, target, codepoints)
+            if manifest.get(output_path.name) == key and output_path.exists():
+                continue
+            work.setdefault(font_path, []).append((output_path, codepoints))
+            manifest[output_path.name] = key
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = [executor.submit(subset_font, font_path, font_jobs) for font_path, font_jobs in work.items()]
+        built = sum(len(future.result()) for future in futures)
+    (output / manifest_name).write_text(json.dumps(manifest, indent=2, sort_keys=True))
+    click.echo(f'built {built} subsets in {time.perf_counter() - start:.2f}s ({len(font_paths) * len(targets) - built} cached)')
+
+    font_viewer.init_headless()
+    report = {}
+    for font_path in font_paths:
+        size = font_path.stat().st_size
+        parse, load = time_loads(font_path, repeat)
+        font_report = report[font_path.stem] = {'size': size, 'parse': parse, 'load': load, 'subsets': {}}
+        click.echo(f'{font_path.stem}: {size} bytes, parse {parse * 1000:.2f}ms, load {load * 1000:.2f}ms')
+        for target in targets:
+            subset_path = output / f'{font_path.stem}-{target}.ttf'
+            subset_size = subset_path.stat().st_size
+            subset_parse, subset_load = time_loads(subset_path, repeat)
+            font_report['subsets'][target] = {
+                'path': str(subset_path),
+                'size': subset_size,
+                'parse': subset_parse,
+                'load': subset_load,
+                'glyphs': len(TTFont(str(subset_path)).getGlyphOrder()),
+            }
+            click.echo(
+                f'    {target:>12}: {subset_size:>6} bytes ({1 - subset_size / size:.0%} smaller), '
+                f'parse {subset_parse * 1000:.2f}ms ({1 - subset_parse / parse:.0%} faster), '
+                f'load {subset_load * 1000:.2f}ms'
+            )
+    (output / 'report.json').write_text(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
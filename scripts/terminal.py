@@ -0,0 +1,407 @@
+#!/usr/bin/env python3
+"""
+Previews sheets in a terminal using 24-bit ANSI colors; no window needed.
+
+Usage: terminal.py [OPTIONS] [FONT]
+
+Options:
+  -p, --point-size SIZE  Font-point to use [default: 8]
+  -t, --text NAME        Text to show first [default: glyphs]
+  -f, --file PATH        Show a text file instead of the built-in texts
+  -c, --codepage NAME    Codepage(s) to include [default: cp437, cp850]
+  -b, --braille          Draw 2x4 pixels per character instead of 1x2
+  --colors               Start with colors on
+  --once                 Print a single frame and exit
+  --help                 Show this message and exit.
+
+Keyboard shortcuts:
+
+    arrows, h/j/k/l: scroll
+    page up/down: scroll a screen at a time
+    t: Change the text displayed
+    c: Toggle colors on/off
+    space: modify colors (when colors are toggled on)
+    b: Toggle braille/half-block pixels
+    + / -: increase/decrease the font size
+    q, escape: Quit
+
+Notes:
+    - each glyph is rasterized once per point size and cached; only the
+      terminal cells that changed since the last frame are rewritten
+    - when stdout is not a terminal a single frame is printed
+"""
+
+import importlib
+import os
+import select
+import signal
+import sys
+from functools import lru_cache
+
+import click
+import numpy as np
+
+import autofit
+import layout
+
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+font_viewer = importlib.import_module('font-viewer')
+
+upper_half_block = '▀'
+braille_base = 0x2800
+# bit of each dot in a braille cell, by (row, column) within the 2x4 grid
+braille_bits = np.array([
+    [0x01, 0x08],
+    [0x02, 0x10],
+    [0x04, 0x20],
+    [0x40, 0x80],
+], dtype=np.uint8)
+
+white = (255, 255, 255)
+
+keys = {
+    '\x1b[A': 'up', 'k': 'up',
+    '\x1b[B': 'down', 'j': 'down',
+    '\x1b[C': 'right', 'l': 'right',
+    '\x1b[D': 'left', 'h': 'left',
+    '\x1b[5~': 'page_up',
+    '\x1b[6~': 'page_down',
+    '+': 'bigger', '=': 'bigger',
+    '-': 'smaller',
+    't': 'text', 'c': 'colors', ' ': 'recolor', 'b': 'braille',
+    'q': 'quit', '\x1b': 'quit',
+}
+
+
+class GlyphCache(object):
+    """Coverage bitmaps of glyphs at one point size, rasterized on first
+    use and sized to the font's cell"""
+
+    def __init__(self, font_path, point_size):
+        self.font = font_viewer.load_font(font_path, point_size)
+        self.cell_width, self.cell_height = autofit.get_cell_size(autofit.get_cell_metrics(font_path), point_size)
+        self.bitmaps = {}
+
+    def get(self, code):
+        bitmap = self.bitmaps.get(code)
+        if bitmap is None:
+            bitmap = np.zeros((self.cell_height, self.cell_width), dtype=np.uint8)
+            if layout.is_visible(code) and code != 0x20:
+                try:
+                    surface = self.font.render(chr(code), True, white, (0, 0, 0))
+                except (ValueError, font_viewer.pygame.error):
+                    surface = None
+                if surface is not None:
+                    coverage = font_viewer.pygame.surfarray.array_red(surface).T
+                    height, width = (min(a, b) for a, b in zip(coverage.shape, bitmap.shape))
+                    bitmap[:height, :width] = coverage[:height, :width]
+            self.bitmaps[code] = bitmap
+        return bitmap
+
+    def compose(self, text_layout):
+        """Coverage of a whole laid out text as a single array"""
+        rows, columns = text_layout.shape
+        image = np.zeros((rows, columns, self.cell_height, self.cell_width), dtype=np.uint8)
+        if len(text_layout.codes):
+            unique_codes, inverse = np.unique(text_layout.codes, return_inverse=True)
+            bitmaps = np.stack([self.get(int(code)) for code in unique_codes])
+            image[text_layout.rows, text_layout.columns] = bitmaps[inverse]
+        return image.swapaxes(1, 2).reshape(rows * self.cell_height, columns * self.cell_width)
+
+
+def encode_half_blocks(pixels):
+    """Two pixels per character: the upper half block drawn in the top
+    pixel's color over the bottom pixel's color"""
+    if pixels.shape[0] % 2:
+        pixels = np.concatenate([pixels, np.zeros_like(pixels[:1])])
+    foreground, background = pixels[0::2], pixels[1::2]
+    characters = np.full(foreground.shape[:2], ord(upper_half_block), dtype=np.uint32)
+    return characters, foreground, background
+
+
+def encode_braille(pixels, threshold=96):
+    """Eight pixels per character as braille dots, drawn in the mean color
+    of the lit pixels"""
+    height, width = pixels.shape[:2]
+    pixels = np.pad(pixels, ((0, -height % 4), (0, -width % 2), (0, 0)))
+    rows, columns = pixels.shape[0] // 4, pixels.shape[1] // 2
+    blocks = pixels.reshape(rows, 4, columns, 2, 3).swapaxes(1, 2)
+    lit = blocks.max(axis=-1) > threshold
+    characters = braille_base + (lit * braille_bits).sum(axis=(2, 3)).astype(np.uint32)
+    counts = np.maximum(lit.sum(axis=(2, 3)), 1)[..., None]
+    foreground = ((blocks * lit[..., None]).sum(axis=(2, 3)) // counts).astype(np.uint8)
+    background = np.zeros_like(foreground)
+    return characters, foreground, background
+
+
+@lru_cache(maxsize=4096)
+def sgr(foreground, background):
+    return f'\x1b[38;2;{foreground[0]};{foreground[1]};{foreground[2]}m\x1b[48;2;{background[0]};{background[1]};{background[2]}m'
+
+
+class TerminalScreen(object):
+    """Writes frames of (characters, foreground, background) arrays,
+    rewriting only the cells that differ from the previous frame"""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.previous = None
+
+    def reset(self):
+        self.previous = None
+        self.stream.write('\x1b[0m\x1b[2J')
+
+    def draw(self, characters, foreground, background):
+        frame = np.dstack([characters[..., None], foreground, background]).astype(np.uint32)
+        if self.previous is None or self.previous.shape != frame.shape:
+            changed = np.ones(characters.shape, dtype=bool)
+        else:
+            changed = (frame != self.previous).any(axis=-1)
+        self.previous = frame
+
+        output = []
+        for row in np.flatnonzero(changed.any(axis=1)):
+            columns = np.flatnonzero(changed[row])
+            last_column, last_style = None, None
+            for column in columns.tolist():
+                if column != last_column:
+                    output.append(f'\x1b[{row + 1};{column + 1}H')
+                style = sgr(tuple(foreground[row, column].tolist()), tuple(background[row, column].tolist()))
+                if style != last_style:
+                    output.append(style)
+                    last_style = style
+                output.append(chr(characters[row, column]))
+                last_column = column + 1
+        if output:
+            output.append('\x1b[0m')
+            self.stream.write(''.join(output))
+        return len(output)
+
+    def status(self, row, message, width):
+        self.stream.write(f'\x1b[{row + 1};1H\x1b[0m\x1b[7m{message[:width]:<{width}}\x1b[0m')
+
+
+class TerminalViewer(object):
+
+    def __init__(self, font_path, point_size, texts, text_name, braille=False, colors=False, stream=None):
+        self.font_path = font_path
+        self.point_size = point_size
+        self.texts = texts
+        self.text_name = text_name
+        self.braille = braille
+        self.stream = stream or sys.stdout
+        self.screen = TerminalScreen(self.stream)
+        self.random_color_generator = font_viewer.get_random_color()
+        self.colors = None
+        self.caches = {}
+        self.sheets = {}
+        self.sheet_colors = {}
+        self.offset = [0, 0]  # pixel row, pixel column
+        self.resized = True
+        if colors:
+            self.colors = self.random_colors()
+
+    @property
+    def glyph_cache(self):
+        cache = self.caches.get(self.point_size)
+        if cache is None:
+            cache = self.caches[self.point_size] = GlyphCache(self.font_path, self.point_size)
+        return cache
+
+    @property
+    def sheet(self):
+        """Coverage and layout of the current text at the current size"""
+        key = self.text_name, self.point_size
+        sheet = self.sheets.get(key)
+        if sheet is None:
+            text_layout = layout.layout(self.texts[self.text_name])
+            sheet = self.sheets[key] = text_layout, self.glyph_cache.compose(text_layout)
+        return sheet
+
+    @property
+    def pixels_per_character(self):
+        return (4, 2) if self.braille else (2, 1)
+
+    def random_colors(self):
+        codes = {int(code) for text in self.texts.values() for code in layout.layout(text).codes}
+        return {code: next(self.random_color_generator) for code in codes}
+
+    def cell_colors(self, text_layout):
+        """Foreground color of every cell of the current text"""
+        colors = self.sheet_colors.get(self.text_name)
+        if colors is None:
+            colors = np.full(text_layout.shape + (3,), 255, dtype=np.uint8)
+            if self.colors:
+                unique_codes, inverse = np.unique(text_layout.codes, return_inverse=True)
+                palette = np.array([self.colors.get(int(code), white) for code in unique_codes], dtype=np.uint8).reshape(-1, 3)
+                colors[text_layout.rows, text_layout.columns] = palette[inverse]
+            self.sheet_colors[self.text_name] = colors
+        return colors
+
+    def frame(self, columns, rows):
+        """Encodes the part of the sheet in view"""
+        text_layout, coverage = self.sheet
+        pixel_rows, pixel_columns = self.pixels_per_character
+        view_height, view_width = rows * pixel_rows, columns * pixel_columns
+        max_top = max(coverage.shape[0] - view_height, 0)
+        max_left = max(coverage.shape[1] - view_width, 0)
+        self.offset = [min(max(self.offset[0], 0), max_top), min(max(self.offset[1], 0), max_left)]
+        top, left = self.offset
+
+        view = np.zeros((view_height, view_width), dtype=np.uint8)
+        visible = coverage[top:top + view_height, left:left + view_width]
+        view[:visible.shape[0], :visible.shape[1]] = visible
+
+        # color the cells in view (plus the partial ones at the edges)
+        cache = self.glyph_cache
+        cell_colors = self.cell_colors(text_layout)
+        first_row, first_column = top // cache.cell_height, left // cache.cell_width
+        cell_colors = cell_colors[first_row:, first_column:]
+        cell_colors = np.pad(cell_colors, ((0, max(rows * pixel_rows // cache.cell_height + 2 - cell_colors.shape[0], 0)),
+                                           (0, max(columns * pixel_columns // cache.cell_width + 2 - cell_colors.shape[1], 0)),
+                                           (0, 0)))
+        foreground = cell_colors.repeat(cache.cell_height, axis=0).repeat(cache.cell_width, axis=1)
+        foreground = foreground[top % cache.cell_height:, left % cache.cell_width:][:view_height, :view_width]
+        alpha = view[..., None].astype(np.uint16)
+        pixels = (foreground * alpha // 255).astype(np.uint8)
+
+        if self.braille:
+            return encode_braille(pixels)
+        return encode_half_blocks(pixels)
+
+    def draw(self):
+        columns, rows = os.get_terminal_size(self.stream.fileno()) if self.stream.isatty() else (80, 24)
+        if self.resized:
+            self.screen.reset()
+            self.resized = False
+        view_rows = max(rows - 1, 1)
+        characters, foreground, background = self.frame(columns, view_rows)
+        self.screen.draw(characters, foreground, background)
+        text_layout, coverage = self.sheet
+        mode = 'braille' if self.braille else 'half-block'
+        self.screen.status(view_rows, f' {self.point_size}-point {self.text_name} {self.font_path.stem} {mode} '
+                                      f'[{self.offset[0]}:{self.offset[1]} of {coverage.shape[0]}x{coverage.shape[1]}]', columns)
+        self.stream.flush()
+        return columns, view_rows
+
+    def handle_key(self, action, columns, rows):
+        pixel_rows, pixel_columns = self.pixels_per_character
+        step_rows, step_columns = self.glyph_cache.cell_height, self.glyph_cache.cell_width
+        if action == 'quit':
+            return False
+        elif action == 'up':
+            self.offset[0] -= step_rows
+        elif action == 'down':
+            self.offset[0] += step_rows
+        elif action == 'left':
+            self.offset[1] -= step_columns
+        elif action == 'right':
+            self.offset[1] += step_columns
+        elif action == 'page_up':
+            self.offset[0] -= rows * pixel_rows
+        elif action == 'page_down':
+            self.offset[0] += rows * pixel_rows
+        elif action == 'bigger':
+            self.point_size = min(self.point_size + 1, autofit.max_point_size)
+        elif action == 'smaller':
+            self.point_size = max(self.point_size - 1, 1)
+        elif action == 'text':
+            text_names = list(self.texts)
+            self.text_name = text_names[(text_names.index(self.text_name) + 1) % len(text_names)]
+            self.offset = [0, 0]
+        elif action == 'colors':
+            self.colors = None if self.colors else self.random_colors()
+            self.sheet_colors.clear()
+        elif action == 'recolor' and self.colors:
+            self.colors = self.random_colors()
+            self.sheet_colors.clear()
+        elif action == 'braille':
+            self.braille = not self.braille
+            self.resized = True
+        return True
+
+    def run(self):
+        import termios
+        import tty
+
+        stdin = sys.stdin.fileno()
+        settings = termios.tcgetattr(stdin)
+
+        def handle_resize(signum, frame):
+            self.resized = True
+
+        previous_handler = signal.signal(signal.SIGWINCH, handle_resize)
+        self.stream.write('\x1b[?1049h\x1b[?25l')
+        try:
+            tty.setcbreak(stdin)
+            running = True
+            while running:
+                columns, rows = self.draw()
+                ready, _, _ = select.select([stdin], [], [], 0.25)
+                if not ready:
+                    continue
+                data = os.read(stdin, 1024).decode(errors='ignore')
+                # one redraw covers every key that was queued
+                for sequence in split_keys(data):
+                    action = keys.get(sequence)
+                    if action and not self.handle_key(action, columns, rows):
+                        running = False
+                        break
+        finally:
+            termios.tcsetattr(stdin, termios.TCSADRAIN, settings)
+            signal.signal(signal.SIGWINCH, previous_handler)
+            self.stream.write('\x1b[0m\x1b[?25h\x1b[?1049l')
+            self.stream.flush()
+
+
+def split_keys(data):
+    """Splits raw terminal input into single keys and escape sequences; an
+    escape followed by another key is that key with Alt (Meta) held, so
+    only an escape on its own is the escape key"""
+    index = 0
+    while index < len(data):
+        if data.startswith('\x1b[', index):
+            end = index + 2
+            while end < len(data) and not ('A' <= data[end] <= 'Z' or data[end] == '~'):
+                end += 1
+            yield data[index:end + 1]
+            index = end + 1
+        elif data.startswith('\x1b', index) and index + 1 < len(data):
+            yield data[index:index + 2]
+            index += 2
+        else:
+            yield data[index]
+            index += 1
+
+
+@click.command()
+@click.argument('font-name', metavar='FONT', required=False, default='Deferral-Regular')
+@click.option('-p', '--point-size', metavar='SIZE', help='Font-point to use', default=8, type=int)
+@click.option('-t', '--text', 'text_name', metavar='NAME', help='Text to show first', default='glyphs')
+@click.option('-f', '--file', 'text_file', metavar='PATH', help='Show a text file', type=click.File())
+@click.option('-c', '--codepage', 'codepage_names', metavar='NAME', help='Codepage(s) to include', multiple=True)
+@click.option('-b', '--braille', is_flag=True, help='Draw 2x4 pixels per character instead of 1x2')
+@click.option('--colors', is_flag=True, help='Start with colors on')
+@click.option('--once', is_flag=True, help='Print a single frame and exit')
+def main(font_name, point_size, text_name, text_file, codepage_names, braille, colors, once):
+    font_path = font_viewer.find_font(font_name)
+    font_viewer.init_headless()
+    codepage_names = tuple(font_viewer.codepages.get_codepages(codepage_names))
+    glyphs = font_viewer.cmap.get_cmap_index(font_path)
+    texts = font_viewer.get_texts(glyphs, codepage_names)
+    if text_file:
+        text_name = text_file.name
+        texts = {text_name: font_viewer.layout_text(text_file.read(), tab_size=4), **texts}
+    if text_name not in texts:
+        raise click.BadParameter(f'{text_name} is not one of {", ".join(texts)}', param_hint="'-t' / '--text'")
+
+    viewer = TerminalViewer(font_path, point_size, texts, text_name, braille=braille, colors=colors)
+    if once or not (sys.stdout.isatty() and sys.stdin.isatty()):
+        viewer.draw()
+        sys.stdout.write('\n')
+    else:
+        viewer.run()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+"""
+Draws laid out text as fixed-size tiles of cells.
+
+Only the tiles that overlap the viewport are rendered and the ones around
+the viewport are rendered ahead of time while the viewer is idle.  The
+cache holds the tiles around the viewport plus a few recently used ones,
+so memory depends on the window size and the width of the text, never on
+the length of the sheet.
+
+Glyphs are placed by their rendered advances, which need not match the
+cell width (a 6pt glyph may advance 3px in a 4px cell), so a line cannot
+be cut into columns that line up with a grid.  By default a tile is
+therefore a strip of whole lines; fixed columns are only seamless for
+fonts whose advances all match the cell width.
+"""
+
+from collections import OrderedDict
+
+import budget
+
+# cells per tile: (columns, rows); None columns are the width of the text
+tile_cells = (None, 16)
+
+# tiles kept beyond the ones around the viewport
+spare_tiles = 16
+
+
+class TiledSheet(object):
+    """Text split into tiles of tile_cells, each rendered by render_tile
+    (called with the text of the tile) the first time it is drawn"""
+
+    cache_name = 'tiles'
+
+    def __init__(self, text, cell_size, render_tile, tile_cells=tile_cells, spare=spare_tiles, surface_budget=None):
+        self.lines = text.split('\n')
+        self.cell_size = cell_size
+        self.render_tile = render_tile
+        self.spare = spare
+        self.capacity = spare
+        self.tiles = OrderedDict()
+        self.budget = surface_budget or budget.default_budget
+        self.columns = max(map(len, self.lines))
+        self.rows = len(self.lines)
+        tile_columns, tile_rows = tile_cells
+        self.tile_cells = max(tile_columns or self.columns, 1), tile_rows
+
+    @property
+    def size(self):
+        """Pixel size of the whole sheet"""
+        cell_width, cell_height = self.cell_size
+        return self.columns * cell_width, self.rows * cell_height
+
+    @property
+    def tile_size(self):
+        return tuple(cells * pixels for cells, pixels in zip(self.tile_cells, self.cell_size))
+
+    @property
+    def tile_counts(self):
+        """Tiles across and down the sheet"""
+        return tuple(-(-cells // tile) for cells, tile in zip((self.columns, self.rows), self.tile_cells))
+
+    def get_text(self, tile):
+        column, row = tile
+        tile_columns, tile_rows = self.tile_cells
+        left = column * tile_columns
+        top = row * tile_rows
+        return '\n'.join(line[left:left + tile_columns] for line in self.lines[top:top + tile_rows])
+
+    def render(self, tile):
+        """Renders a tile along with the line above it, which overlaps the
+        tile's first row by a pixel where the tile's lines draw nothing,
+        then cuts that line off"""
+        column, row = tile
+        if row == 0:
+            return self.render_tile(self.get_text(tile))
+        tile_columns = self.tile_cells[0]
+        left = column * tile_columns
+        above = self.lines[row * self.tile_cells[1] - 1][left:left + tile_columns]
+        surface = self.render_tile(f'{above}\n{self.get_text(tile)}')
+        line_height = self.cell_size[1]
+        return surface.subsurface((0, line_height, surface.get_width(), surface.get_height() - line_height)).copy()
+
+    def get_tile(self, tile):
+        """Surface of one tile, rendering it (and evicting the least
+        recently used tile) when it is not cached"""
+        if tile in self.tiles:
+            self.tiles.move_to_end(tile)
+            self.budget.touch(self.cache_name, (id(self), tile))
+            return self.tiles[tile]
+        surface = self.tiles[tile] = self.render(tile)
+        self.budget.add(self.cache_name, (id(self), tile), surface, self.drop)
+        while len(self.tiles) > self.capacity:
+            evicted, evicted_surface = self.tiles.popitem(last=False)
+            self.budget.remove(self.cache_name, (id(self), evicted))
+        return surface
+
+    def drop(self, key):
+        """Forgets a tile that the surface budget evicted"""
+        owner, tile = key
+        self.tiles.pop(tile, None)
+
+    def release(self):
+        """Forgets every tile, for when the sheet is no longer drawn"""
+        for tile in self.tiles:
+            self.budget.remove(self.cache_name, (id(self), tile))
+        self.tiles.clear()
+
+    def get_visible_tiles(self, offset, viewport, margin=0):
+        """Tiles overlapping a viewport of (width, height) pixels whose top
+        left is at offset (x, y) in the sheet, grown by margin tiles"""
+        spans = []
+        for start, length, tile_length, count in zip(offset, viewport, self.tile_size, self.tile_counts):
+            tile_length = max(tile_length, 1)
+            first = max(start // tile_length - margin, 0)
+            last = min((start + length - 1) // tile_length + margin, count - 1)
+            spans.append(range(first, last + 1))
+        columns, rows = spans
+        return [(column, row) for row in rows for column in columns]
+
+    def draw(self, surface, offset):
+        """Blits the tiles in view of surface, with the sheet scrolled to
+        offset"""
+        x, y = offset
+        tile_width, tile_height = self.tile_size
+        self.capacity = len(self.get_visible_tiles(offset, surface.get_size(), margin=1)) + self.spare
+        blits = [
+            (self.get_tile(tile), (tile[0] * tile_width - x, tile[1] * tile_height - y))
+            for tile in self.get_visible_tiles(offset, surface.get_size())
+        ]
+        surface.blits(blits, doreturn=False)
+
+    def prefetch(self, offset, viewport, limit=1):
+        """Renders up to limit of the uncached tiles bordering the viewport;
+        returns whether any were left to render"""
+        neighbours = [
+            tile for tile in self.get_visible_tiles(offset, viewport, margin=1)
+            if tile not in self.tiles
+        ]
+        for tile in neighbours[:limit]:
+            self.get_tile(tile)
+        return len(neighbours) > limit
@@ -2,14 +2,123 @@
 import itertools
 import os
 import sys
+from functools import lru_cache
 from pathlib import Path
 
 import pygame
 
+import autofit
+
 
 class Viewer(object):
+    """Event engine for pygame viewers
+
+    Subclasses describe their keys in get_bindings; the table is built once
+    and events are dispatched with a single lookup on (event type, key,
+    modifiers).  Handlers only update state and invalidate what needs
+    rebuilding, so a whole batch of queued events (e.g. key repeats) costs
+    one refresh and one redraw.
+    """
+
+    # Modifier groups that bindings can require; left/right variants and
+    #  lock keys are folded away before lookup
+    modifier_masks = (pygame.KMOD_SHIFT, pygame.KMOD_CTRL, pygame.KMOD_ALT, pygame.KMOD_META)
+
+    # Keys with a modifier of None match regardless of the modifiers held
+    any_modifiers = None
+
+    fps = 60
+    key_repeat = (300, 30)  # delay, interval in ms
+
+    def __init__(self):
+        self.bindings = self.get_bindings()
+        self.held_bindings = self.get_held_bindings()
+        self.invalidated = set()
+        self.running = False
+        self.clock = pygame.time.Clock()
+
+    def get_bindings(self):
+        """Maps (event type, key, modifiers) to (function, args, kwds);
+        functions are called with the event followed by args and kwds"""
+        return {
+            # Resize
+            (pygame.VIDEORESIZE, None, None): (self.handle_video_resize, [], {}),
+
+            # Exit
+            (pygame.QUIT, None, None): (self.quit, [], {}),
+            (pygame.KEYDOWN, pygame.K_q, self.any_modifiers): (self.quit, [], {}),
+            (pygame.KEYDOWN, pygame.K_ESCAPE, self.any_modifiers): (self.quit, [], {}),
+        }
 
-    def calculate_max_font_point(self, point_size, dimensions=None, resolution=None, font_path=None):
+    def get_held_bindings(self):
+        """Maps keys to (function, args, kwds) called once per frame while
+        the key is held down"""
+        return {}
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def normalize_modifiers(mods):
+        return sum(mask for mask in Viewer.modifier_masks if mods & mask)
+
+    def dispatch(self, event):
+        key = getattr(event, 'key', None)
+        mods = self.normalize_modifiers(event.mod) if key is not None else None
+        data = self.bindings.get((event.type, key, mods))
+        if data is None and mods is not None:
+            data = self.bindings.get((event.type, key, self.any_modifiers))
+        if data:
+            func, args, kwds = data
+            func(event, *args, **kwds)
+        return data is not None
+
+    def handle_events(self):
+        """Dispatches every queued event, then any held keys"""
+        for event in pygame.event.get():
+            self.dispatch(event)
+        if self.held_bindings:
+            pressed = pygame.key.get_pressed()
+            for key, (func, args, kwds) in self.held_bindings.items():
+                if pressed[key]:
+                    func(None, *args, **kwds)
+
+    def invalidate(self, *parts):
+        self.invalidated.update(parts or ['screen'])
+
+    def refresh(self, parts):
+        """Rebuilds whatever parts were invalidated since the last frame"""
+
+    def flush(self):
+        """Refreshes and redraws once for everything invalidated so far"""
+        if self.invalidated:
+            parts, self.invalidated = self.invalidated, set()
+            self.refresh(parts)
+            self.draw()
+
+    def draw(self):
+        """Draws the current state to the display"""
+
+    def idle(self):
+        """Called once per frame after drawing, for work that can wait"""
+
+    def run(self):
+        pygame.key.set_repeat(*self.key_repeat)
+        self.running = True
+        self.invalidate('screen')
+        while self.running:
+            self.handle_events()
+            if not self.running:
+                break
+            self.flush()
+            self.idle()
+            self.clock.tick(self.fps)
+
+    def quit(self, event=None):
+        self.running = False
+
+    def handle_video_resize(self, event):
+        self.invalidate('screen')
+
+    def calculate_max_font_point(self, point_size=None, dimensions=None, resolution=None, font_path=None):
         # Set dimensions
         default_dimensions = (80, 50)
         dimensions = dimensions or default_dimensions
@@ -18,6 +127,11 @@ class Viewer(object):
         info = pygame.display.Info()
         resolution = resolution or (info.current_w, info.current_h)
 
+        # Fit the grid using the font's real cell size
+        cell_metrics = autofit.get_cell_metrics(font_path) if font_path else autofit.square_cell
+        max_point_size = point_size or autofit.max_point_size
+        return autofit.fit_point_size(cell_metrics, tuple(resolution), tuple(dimensions), max_point_size=max_point_size)
+
     def get_font_path(self, font_name):
         standards = ['', '-Square', '-Normal', '-Regular', '-Narrow']
         extensions = ['', '.ttf', '.otf']
@@ -45,39 +159,3 @@ class Viewer(object):
             repo_path / 'fonts',
         ] if path.exists()]
         return map(Path, project + mapping[platform])
-
-    def handle_keyboard_input(self):
-        shift = lambda m: (m & pygame.KMOD_SHIFT) and (m & ~(pygame.KMOD_LSHIFT | pygame.KMOD_RSHIFT | pygame.KMOD_SHIFT) == 0)
-        meta = lambda m: (m & pygame.KMOD_META) and (m & ~(pygame.KMOD_LMETA | pygame.KMOD_RMETA | pygame.KMOD_META) == 0)
-        shift_meta = lambda m: (m & pygame.KMOD_META & pygame.KMOD_SHIFT) and (m & ~(pygame.KMOD_LMETA | pygame.KMOD_RMETA | pygame.KMOD_META | pygame.KMOD_LSHIFT | pygame.KMOD_RSHIFT | pygame.KMOD_SHIFT) == 0)
-
-        for event in pygame.event.get():
-            mods = pygame.key.get_mods()
-
-            mapping = {
-                # Resize
-                (pygame.VIDEORESIZE, None, None): (self.handle_video_resize, [], {}),
-
-                # Exit
-                (pygame.QUIT, None, None): (sys.exit, [0], {}),
-                (pygame.KEYDOWN, pygame.K_q, None): (sys.exit, [0], {}),
-                (pygame.KEYDOWN, pygame.K_ESCAPE, None): (sys.exit, [0], {}),
-
-                # Colors
-                (pygame.KEYDOWN, pygame.K_c, None): (self.toggle_colors, [], {}),
-
-                # Fonts
-                (pygame.KEYDOWN, pygame.K_f, None): (self.toggle_colors, [], {}),
-
-                # Text
-                (pygame.KEYDOWN, pygame.K_t, None): (self.cycle_text, [], {}),
-            }
-
-            data = mapping.get((event.type, None, mods))
-            if not data:
-                data = mapping.get((event.type, event.key))
-
-            if data:
-                func, args, kwds = data
-                func(*args, **kwds)
-                continue
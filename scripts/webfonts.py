@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Builds WOFF2 and WOFF web fonts from the TTF fonts.
+
+Usage: webfonts.py [OPTIONS] [FONTS]...
+
+  FONTS are font names or paths [default: every font in <repo>/fonts]
+
+Options:
+  -s, --subsets          Also build the subsets in <repo>/fonts/subsets
+                         (see subset_fonts.py)
+  -o, --output PATH      Output folder [default: <repo>/fonts/web]
+  -r, --repeat COUNT     Loads per font when timing [default: 20]
+  --help                 Show this message and exit.
+
+Notes:
+    - WOFF2 needs the brotli package
+    - a web font is only rebuilt when its source font changes, and every
+      build is checked to map the same glyphs as its source
+"""
+
+import json
+from pathlib import Path
+
+import click
+from fontTools.ttLib import TTFont
+
+from subset_fonts import font_viewer, hash_file, load_manifest, manifest_name, time_parse
+
+flavors = ('woff2', 'woff')
+
+
+def build_web_font(font_path, output_path, flavor):
+    font = TTFont(str(font_path))
+    font.flavor = flavor
+    font.save(str(output_path))
+
+
+def get_glyph_set(font_path):
+    """(codepoint, glyph name) of every mapping in a font's cmap"""
+    glyphs = font_viewer.cmap.get_cmap_index(font_path)
+    return list(zip(glyphs.codepoints.tolist(), glyphs.get_glyph_names()))
+
+
+@click.command()
+@click.argument('fonts', nargs=-1)
+@click.option('-s', '--subsets', is_flag=True, help='Also build the subsets in <repo>/fonts/subsets')
+@click.option('-o', '--output', metavar='PATH', type=click.Path(path_type=Path), help='Output folder')
+@click.option('-r', '--repeat', metavar='COUNT', default=20, type=int, help='Loads per font when timing')
+def main(fonts, subsets, output, repeat):
+    fonts_folder = font_viewer.this_repo / 'fonts'
+    font_paths = font_viewer.find_fonts(fonts)
+    if subsets:
+        font_paths += sorted((fonts_folder / 'subsets').glob('*.ttf'))
+    output = output or fonts_folder / 'web'
+    output.mkdir(parents=True, exist_ok=True)
+
+    manifest = load_manifest(output)
+    report = {}
+    failed = []
+    for font_path in font_paths:
+        font_hash = hash_file(font_path)
+        source_glyphs = get_glyph_set(font_path)
+        ttf_size = font_path.stat().st_size
+        ttf_parse = time_parse(font_path, repeat)
+        font_report = report[font_path.stem] = {'size': ttf_size, 'parse': ttf_parse}
+        click.echo(f'{font_path.stem}: {ttf_size} bytes, parse {ttf_parse * 1000:.2f}ms')
+
+        for flavor in flavors:
+            output_path = output / f'{font_path.stem}.{flavor}'
+            key = f'{font_hash}:{flavor}'
+            built = not (manifest.get(output_path.name) == key and output_path.exists())
+            if built:
+                build_web_font(font_path, output_path, flavor)
+
+            matches = get_glyph_set(output_path) == source_glyphs
+            if matches:
+                manifest[output_path.name] = key
+            else:
+                failed.append(output_path.name)
+                manifest.pop(output_path.name, None)
+
+            size = output_path.stat().st_size
+            parse = time_parse(output_path, repeat)
+            font_report[flavor] = {'size': size, 'parse': parse, 'built': built, 'glyphs_match': matches}
+            click.echo(
+                f'    {flavor:>5}: {size:>6} bytes ({1 - size / ttf_size:.0%} smaller), '
+                f'decompress+parse {parse * 1000:.2f}ms ({parse / ttf_parse:.1f}x ttf)'
+                f'{"" if built else ", cached"}{"" if matches else ", GLYPHS DIFFER"}'
+            )
+
+    (output / manifest_name).write_text(json.dumps(manifest, indent=2, sort_keys=True))
+    (output / 'report.json').write_text(json.dumps(report, indent=2))
+    if failed:
+        raise click.ClickException(f'glyphs differ from the source font in {", ".join(failed)}')
+
+
+if __name__ == '__main__':
+    main()